@@ -0,0 +1,389 @@
+"""Reproducible load test for the API with a machine-readable baseline.
+
+Starts the app with uvicorn against a MongoDB (an existing one via
+--mongo-url, or a throwaway `mongod` via --spawn-mongod), seeds a fresh
+database with realistic volumes, drives each workload for a fixed time and
+reports RPS, latency percentiles and the server's peak RSS. Run from backend/:
+
+    python -m benchmarks.load --spawn-mongod --output results.json
+    python -m benchmarks.load --mongo-url mongodb://localhost:27017 --write-baseline benchmarks/baseline.json
+    python -m benchmarks.load --mongo-url mongodb://localhost:27017 --baseline benchmarks/baseline.json
+
+With --baseline the exit status is 1 when any workload's RPS drops, or its
+p99 rises, by more than --tolerance compared with the baseline file.
+--base-url targets an already running server instead (no seeding, no RSS);
+start that one with RATE_LIMIT_ENABLED=false, as all load comes from one address.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import requests
+from pymongo import MongoClient
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+CITIES = ["Austin", "Dallas", "Houston", "Miami", "Chicago", "Denver", "Seattle", "Phoenix", "Atlanta", "Boston"]
+PLATFORMS = ["Uber", "Lyft", "Both"]
+STATUSES = ["pending", "contacted", "approved", "rejected"]
+VEHICLES = [("Toyota", "Camry"), ("Honda", "Accord"), ("Tesla", "Model 3"), ("Hyundai", "Sonata"), ("Ford", "Fusion")]
+BASE_PAGES = ["home", "drivers", "advertisers", "about"]
+MEDIA_SIZES = [10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 50 * 1024 ** 2]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until(check, timeout: float, what: str):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {what}")
+
+
+# ---------- Environment ----------
+
+def spawn_mongod(workdir: Path):
+    binary = shutil.which("mongod")
+    if not binary:
+        sys.exit("--spawn-mongod needs a mongod binary on PATH")
+    port = free_port()
+    dbpath = workdir / "db"
+    dbpath.mkdir()
+    proc = subprocess.Popen(
+        [binary, "--dbpath", str(dbpath), "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"mongodb://127.0.0.1:{port}"
+    wait_until(lambda: MongoClient(url, serverSelectionTimeoutMS=500).admin.command("ping"), 30, "mongod")
+    return proc, url
+
+
+def spawn_server(mongo_url: str, db_name: str):
+    port = free_port()
+    # Every simulated client connects from 127.0.0.1, which the rate limiter would treat as one caller
+    env = dict(os.environ, MONGO_URL=mongo_url, DB_NAME=db_name, RATE_LIMIT_ENABLED="false")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", "1", "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    wait_until(lambda: requests.get(f"{base_url}/api/", timeout=1).ok, 30, "the API server")
+    return proc, base_url
+
+
+class RSSSampler:
+    """Samples a process's resident set size from /proc to find the peak during a workload"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _rss_kb(self) -> int:
+        with open(f"/proc/{self.pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+        return 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, self._rss_kb())
+            time.sleep(0.1)
+
+    def __enter__(self):
+        if self.pid and os.path.exists(f"/proc/{self.pid}/status"):
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+# ---------- Seeding ----------
+
+def iso(dt: datetime) -> str:
+    return dt.isoformat()
+
+
+def seed(mongo_url: str, db_name: str, base_url: str, scale: float, seed_value: int):
+    rng = random.Random(seed_value)
+    db = MongoClient(mongo_url)[db_name]
+    now = datetime.now(timezone.utc)
+
+    def stamp():
+        return iso(now - timedelta(seconds=rng.randint(0, 90 * 24 * 3600), microseconds=rng.randint(0, 999999)))
+
+    def insert_batched(collection, make, count):
+        for start in range(0, count, 5000):
+            collection.insert_many([make(i) for i in range(start, min(count, start + 5000))], ordered=False)
+
+    def application(i):
+        make, model = rng.choice(VEHICLES)
+        return {
+            "id": str(uuid.uuid4()), "name": f"Driver {i}", "email": f"driver{i}@example.com",
+            "phone": f"555-{i % 10000:04d}", "city": rng.choice(CITIES), "platform": rng.choice(PLATFORMS),
+            "vehicle_year": str(rng.randint(2012, 2025)), "vehicle_make": make, "vehicle_model": model,
+            "photo_id": None, "status": rng.choice(STATUSES), "submitted_at": stamp(),
+        }
+
+    def submission(i):
+        return {
+            "id": str(uuid.uuid4()), "company_name": f"Company {i}", "contact_name": f"Contact {i}",
+            "email": f"ads{i}@example.com", "budget_range": rng.choice(["<$5k", "$5k-$10k", "$10k+"]),
+            "cities": ", ".join(rng.sample(CITIES, 3)), "ad_formats": rng.choice(["video", "static", "video, static"]),
+            "creative_id": None, "status": rng.choice(STATUSES), "submitted_at": stamp(),
+        }
+
+    def email_log(i):
+        return {
+            "id": str(uuid.uuid4()), "log_type": "driver_application", "recipient": "ops@example.com",
+            "subject": f"New Driver Application - Driver {i}", "body": "New Driver Application Received\n" * 6,
+            "form_data": {"name": f"Driver {i}", "city": rng.choice(CITIES)}, "timestamp": stamp(), "status": "sent",
+        }
+
+    pages = BASE_PAGES + [f"landing-{i}" for i in range(16)]
+
+    def block(i):
+        return {
+            "id": str(uuid.uuid4()), "page": pages[i % len(pages)], "section_id": f"section_{i}",
+            "order": i // len(pages), "is_active": rng.random() > 0.05, "updated_at": stamp(),
+            "content": {"title": f"Section {i}", "description": "Lorem ipsum dolor sit amet. " * 40},
+        }
+
+    counts = {
+        "driver_applications": int(100_000 * scale),
+        "advertiser_submissions": int(20_000 * scale),
+        "email_logs": int(120_000 * scale),
+        "content_blocks": max(len(pages), int(1_000 * scale)),
+    }
+    started = time.perf_counter()
+    insert_batched(db.driver_applications, application, counts["driver_applications"])
+    insert_batched(db.advertiser_submissions, submission, counts["advertiser_submissions"])
+    insert_batched(db.email_logs, email_log, counts["email_logs"])
+    insert_batched(db.content_blocks, block, counts["content_blocks"])
+
+    media_ids = []
+    for size in MEDIA_SIZES:
+        files = {"file": (f"seed-{size}.bin", os.urandom(size), "application/octet-stream")}
+        media_ids.append(requests.post(f"{base_url}/api/cms/media", files=files).json()["id"])
+    print(f"seeded {counts} and {len(media_ids)} media files in {time.perf_counter() - started:.1f}s")
+    return {"pages": pages, "media_ids": media_ids}
+
+
+# ---------- Workloads ----------
+
+def public_read(session, base_url, rng, fixtures):
+    page = rng.choice(BASE_PAGES) if rng.random() < 0.8 else rng.choice(fixtures["pages"])
+    return session.get(f"{base_url}/api/cms/blocks/{page}")
+
+
+def submit(session, base_url, rng, fixtures):
+    if rng.random() < 0.7:
+        make, model = rng.choice(VEHICLES)
+        return session.post(f"{base_url}/api/drivers/apply", json={
+            "name": "Load Test", "email": "load@example.com", "phone": "555-0100", "city": rng.choice(CITIES),
+            "platform": rng.choice(PLATFORMS), "vehicle_year": "2021", "vehicle_make": make, "vehicle_model": model,
+        })
+    return session.post(f"{base_url}/api/advertisers/contact", json={
+        "company_name": "Load Test Co", "contact_name": "Load Test", "email": "load@example.com",
+        "budget_range": "$5k-$10k", "cities": "Austin, Dallas", "ad_formats": "video",
+    })
+
+
+def admin_list(session, base_url, rng, fixtures):
+    path = rng.choice(["/api/drivers/applications", "/api/advertisers/submissions", "/api/admin/email-logs"])
+    params = {"limit": 100}
+    if rng.random() < 0.5:
+        params["status"] = rng.choice(STATUSES)
+    return session.get(f"{base_url}{path}", params=params)
+
+
+def export(session, base_url, rng, fixtures):
+    params = {"status": rng.choice(STATUSES), "city": rng.choice(CITIES), "format": rng.choice(["csv", "ndjson"])}
+    response = session.get(f"{base_url}/api/drivers/applications/export", params=params, stream=True)
+    for _ in response.iter_content(64 * 1024):
+        pass
+    return response
+
+
+def upload(session, base_url, rng, fixtures):
+    size = rng.choice(MEDIA_SIZES[:4])
+    files = {"file": ("load.bin", os.urandom(size), "application/octet-stream")}
+    return session.post(f"{base_url}/api/upload", files=files)
+
+
+def media_download(session, base_url, rng, fixtures):
+    media_id = rng.choice(fixtures["media_ids"][:3])
+    response = session.get(f"{base_url}/api/cms/media/{media_id}/raw", stream=True)
+    for _ in response.iter_content(64 * 1024):
+        pass
+    return response
+
+
+MIXED = [(public_read, 70), (submit, 12), (admin_list, 8), (media_download, 5), (upload, 3), (export, 2)]
+
+WORKLOADS = {
+    "public_reads": [(public_read, 1)],
+    "submit_burst": [(submit, 1)],
+    "admin_lists": [(admin_list, 1)],
+    "exports": [(export, 1)],
+    "uploads": [(upload, 1)],
+    "mixed": MIXED,
+}
+
+
+def run_workload(base_url, mix, fixtures, concurrency, duration, pid, seed_value):
+    actions, weights = zip(*mix)
+    stop = threading.Event()
+    latencies, errors = [], []
+
+    def worker(index):
+        rng = random.Random(seed_value + index)
+        session = requests.Session()
+        while not stop.is_set():
+            action = rng.choices(actions, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = action(session, base_url, rng, fixtures)
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            (latencies if ok else errors).append((time.perf_counter() - start) * 1000)
+
+    with RSSSampler(pid) as rss, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        jobs = [pool.submit(worker, i) for i in range(concurrency)]
+        time.sleep(duration)
+        stop.set()
+        for job in jobs:
+            job.result()
+
+    latencies.sort()
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 2) if latencies else None
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "peak_rss_mb": round(rss.peak_kb / 1024, 1) if rss.peak_kb else None,
+    }
+
+
+# ---------- Baseline comparison ----------
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if previous["rps"] and current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {previous['rps']} -> {current['rps']}")
+        if previous["p99_ms"] and current["p99_ms"] and current["p99_ms"] > previous["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {previous['p99_ms']}ms -> {current['p99_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--mongo-url", help="MongoDB to seed and run the app against")
+    target.add_argument("--spawn-mongod", action="store_true", help="start a throwaway mongod")
+    target.add_argument("--base-url", help="benchmark an already running, already seeded server")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help="comma separated subset to run")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for seeded volumes")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="seconds per workload")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--write-baseline", help="write results as the new baseline file")
+    parser.add_argument("--baseline", help="compare against this baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    processes = []
+    workdir = Path(tempfile.mkdtemp(prefix="ridemedia-bench-"))
+    db_name = f"benchmark_{int(time.time())}"
+    try:
+        server_pid = None
+        fixtures = {"pages": BASE_PAGES, "media_ids": []}
+        if args.base_url:
+            base_url = args.base_url
+            media = requests.get(f"{base_url}/api/cms/media").json()
+            fixtures["media_ids"] = [item["id"] for item in media] or ["missing"]
+        else:
+            mongo_url = args.mongo_url
+            if args.spawn_mongod:
+                mongod, mongo_url = spawn_mongod(workdir)
+                processes.append(mongod)
+            server, base_url = spawn_server(mongo_url, db_name)
+            processes.append(server)
+            server_pid = server.pid
+            fixtures = seed(mongo_url, db_name, base_url, args.scale, args.seed)
+
+        results = {}
+        for name in args.workloads.split(","):
+            results[name] = run_workload(
+                base_url, WORKLOADS[name], fixtures, args.concurrency, args.duration, server_pid, args.seed
+            )
+            r = results[name]
+            print(f"{name:<14}{r['rps']:>9} rps  p50 {r['p50_ms']}ms  p95 {r['p95_ms']}ms  "
+                  f"p99 {r['p99_ms']}ms  errors {r['errors']}  peak rss {r['peak_rss_mb']}MB")
+
+        report = {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "config": {k: getattr(args, k) for k in ("scale", "concurrency", "duration", "seed")},
+            "results": results,
+        }
+        for path in filter(None, (args.output, args.write_baseline)):
+            Path(path).write_text(json.dumps(report, indent=2) + "\n")
+
+        if args.baseline:
+            regressions = compare(results, json.loads(Path(args.baseline).read_text())["results"], args.tolerance)
+            for line in regressions:
+                print(f"REGRESSION {line}")
+            if regressions:
+                sys.exit(1)
+            print(f"No regressions beyond {args.tolerance:.0%} of the baseline")
+    finally:
+        for proc in reversed(processes):
+            proc.terminate()
+            proc.wait(timeout=30)
+        if not args.base_url and args.mongo_url:
+            MongoClient(args.mongo_url).drop_database(db_name)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
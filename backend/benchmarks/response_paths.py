@@ -0,0 +1,145 @@
+"""Compare the response_model read path with the orjson fast path.
+
+Both routes return the same stored-looking rows; the only difference is
+whether FastAPI validates and serializes them through the model or orjson
+writes them directly. Run from backend/:
+
+    python -m benchmarks.response_paths --rows 1000 --requests 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import List
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+
+from server import DriverApplication, AdvertiserSubmission, ContentBlock, EmailLog, MediaFile
+
+
+def driver_row(i: int) -> dict:
+    return DriverApplication(
+        name=f"Driver {i}", email=f"driver{i}@example.com", phone="555-0100",
+        city="Austin", platform="Uber", vehicle_year="2021",
+        vehicle_make="Toyota", vehicle_model="Camry"
+    ).model_dump()
+
+
+def advertiser_row(i: int) -> dict:
+    return AdvertiserSubmission(
+        company_name=f"Company {i}", contact_name="Pat Doe", email=f"ads{i}@example.com",
+        budget_range="$5k-$10k", cities="Austin, Dallas", ad_formats="video, static"
+    ).model_dump()
+
+
+def email_log_row(i: int) -> dict:
+    return EmailLog(
+        log_type="driver_application", recipient="ops@example.com",
+        subject=f"New Driver Application - Driver {i}", body="New Driver Application Received\n" * 8,
+        form_data=driver_row(i)
+    ).model_dump()
+
+
+def content_block_row(i: int) -> dict:
+    return ContentBlock(
+        page="home", section_id=f"section_{i}", order=i,
+        content={"title": "Transform Your", "description": "Join 500+ drivers " * 10}
+    ).model_dump()
+
+
+def media_row(i: int) -> dict:
+    return MediaFile(
+        filename=f"hero_{i}.jpg", storage_id="65f000000000000000000000",
+        content_type="image/jpeg", size=250_000
+    ).model_dump()
+
+
+CASES = {
+    "driver_applications": (DriverApplication, driver_row),
+    "advertiser_submissions": (AdvertiserSubmission, advertiser_row),
+    "email_logs": (EmailLog, email_log_row),
+    "content_blocks": (ContentBlock, content_block_row),
+    "media_files": (MediaFile, media_row),
+}
+
+
+def build_app(model, rows: List[dict]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/validated", response_model=List[model])
+    async def validated():
+        return rows
+
+    @app.get("/fast", response_model=List[model])
+    async def fast():
+        return ORJSONResponse(rows)
+
+    return app
+
+
+async def call(app: FastAPI, path: str) -> int:
+    """Drive one request through the ASGI app and return the body size"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": [],
+        "server": ("bench", 80), "client": ("bench", 1),
+    }
+    size = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return size
+
+
+async def measure(app: FastAPI, path: str, requests: int) -> dict:
+    for _ in range(min(20, requests)):
+        await call(app, path)
+    latencies = []
+    cpu_start = time.process_time()
+    for _ in range(requests):
+        start = time.perf_counter()
+        size = await call(app, path)
+        latencies.append((time.perf_counter() - start) * 1000)
+    cpu_ms = (time.process_time() - cpu_start) * 1000 / requests
+    latencies.sort()
+    return {
+        "mean_ms": statistics.fmean(latencies),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "cpu_ms": cpu_ms,
+        "bytes": size,
+    }
+
+
+async def main(rows: int, requests: int):
+    print(f"{rows} rows per response, {requests} requests per path")
+    print(f"{'collection':<24}{'path':<11}{'mean ms':>9}{'p50 ms':>9}{'p99 ms':>9}{'cpu ms':>9}{'bytes':>10}")
+    for name, (model, make_row) in CASES.items():
+        app = build_app(model, [make_row(i) for i in range(rows)])
+        results = {path: await measure(app, f"/{path}", requests) for path in ("validated", "fast")}
+        for path, r in results.items():
+            print(f"{name:<24}{path:<11}{r['mean_ms']:>9.2f}{r['p50_ms']:>9.2f}"
+                  f"{r['p99_ms']:>9.2f}{r['cpu_ms']:>9.2f}{r['bytes']:>10}")
+        speedup = results["validated"]["cpu_ms"] / results["fast"]["cpu_ms"]
+        print(f"{'':<24}{'speedup':<11}{speedup:>8.1f}x cpu")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.requests))
@@ -0,0 +1,92 @@
+"""Check that public page reads stay fast while large uploads are in flight.
+
+Runs against a live server (uvicorn server:app with a single worker and a
+real MongoDB). It first samples GET /api/cms/blocks/{page} on its own, then
+samples it again while several clients upload large files, and compares the
+latency percentiles of the two phases. Start the server with
+RATE_LIMIT_ENABLED=false: every client here shares one address, so the
+limiter would otherwise reject most of the traffic.
+
+    python -m benchmarks.upload_isolation --base-url http://localhost:8001 \\
+        --uploaders 4 --upload-mb 10 --seconds 15
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def check(response):
+    if response.status_code == 429:
+        raise SystemExit("Rate limited: restart the server with RATE_LIMIT_ENABLED=false")
+    response.raise_for_status()
+
+
+def read_loop(base_url, page, stop, samples):
+    session = requests.Session()
+    while not stop.is_set():
+        start = time.perf_counter()
+        check(session.get(f"{base_url}/api/cms/blocks/{page}"))
+        samples.append((time.perf_counter() - start) * 1000)
+
+
+def upload_loop(base_url, payload, stop, counter):
+    session = requests.Session()
+    while not stop.is_set():
+        files = {"file": ("load-test.bin", payload, "application/octet-stream")}
+        check(session.post(f"{base_url}/api/upload", files=files))
+        counter.append(len(payload))
+
+
+def run_phase(base_url, page, readers, seconds, uploaders=0, payload=b""):
+    stop = threading.Event()
+    samples, uploaded = [], []
+    with ThreadPoolExecutor(max_workers=readers + uploaders) as pool:
+        jobs = [pool.submit(read_loop, base_url, page, stop, samples) for _ in range(readers)]
+        jobs += [pool.submit(upload_loop, base_url, payload, stop, uploaded) for _ in range(uploaders)]
+        time.sleep(seconds)
+        stop.set()
+        for job in jobs:
+            job.result()
+    return samples, sum(uploaded)
+
+
+def report(label, samples, seconds, uploaded=0):
+    line = (f"{label:<16}{len(samples) / seconds:>8.1f} rps"
+            f"{percentile(samples, 50):>9.1f} p50{percentile(samples, 95):>9.1f} p95"
+            f"{percentile(samples, 99):>9.1f} p99 ms")
+    if uploaded:
+        line += f"   uploads {uploaded / seconds / 1024 / 1024:.1f} MB/s"
+    print(line)
+    return percentile(samples, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default=os.environ.get("BENCH_BASE_URL", "http://localhost:8001"))
+    parser.add_argument("--page", default="home")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--uploaders", type=int, default=4)
+    parser.add_argument("--upload-mb", type=float, default=10)
+    parser.add_argument("--seconds", type=float, default=15)
+    args = parser.parse_args()
+
+    payload = os.urandom(int(args.upload_mb * 1024 * 1024))
+    idle, _ = run_phase(args.base_url, args.page, args.readers, args.seconds)
+    busy, uploaded = run_phase(args.base_url, args.page, args.readers, args.seconds, args.uploaders, payload)
+
+    idle_p99 = report("reads only", idle, args.seconds)
+    busy_p99 = report("with uploads", busy, args.seconds, uploaded)
+    print(f"p99 ratio under upload load: {busy_p99 / idle_p99:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
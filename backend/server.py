@@ -1,29 +1,363 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Header, Request, Query, BackgroundTasks
+from fastapi.responses import JSONResponse, Response, StreamingResponse, ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from bson import ObjectId
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, TypeAdapter
 from typing import List, Optional, Dict, Any
+from collections import OrderedDict
 import uuid
-from datetime import datetime, timezone
+import time
+import asyncio
+from datetime import datetime, timezone, timedelta
+from email.message import EmailMessage
+from email.utils import format_datetime, parsedate_to_datetime
 from passlib.context import CryptContext
+from PIL import Image, ImageOps
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import gridfs
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel, ReturnDocument, UpdateOne, WriteConcern, monitoring
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError, WriteError
 import base64
+import binascii
+import csv
+import functools
+import hashlib
+import io
 import json
+import multiprocessing
+import re
+import secrets
+import smtplib
+import threading
+import zlib
+
+try:
+    import brotli
+except ImportError:  # listed in requirements; a build without it serves the CMS snapshot gzip-only
+    brotli = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# ============ Metrics ============
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Request latency by route", ["method", "route", "status"]
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Response body size by route", ["method", "route"],
+    buckets=[2 ** i for i in range(7, 28, 2)]
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled")
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ["collection", "command"],
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5]
+)
+MONGO_COMMAND_FAILURES = Counter("mongo_command_failures_total", "Failed MongoDB commands", ["collection", "command"])
+CMS_CACHE_REQUESTS = Counter("cms_cache_requests_total", "CMS page cache lookups", ["result"])
+CMS_CACHE_HITS = CMS_CACHE_REQUESTS.labels("hit")
+CMS_CACHE_MISSES = CMS_CACHE_REQUESTS.labels("miss")
+UPLOAD_BYTES = Counter("upload_bytes_total", "Bytes received through uploads")
+RATE_LIMITED = Counter("rate_limited_requests_total", "Requests rejected by the rate limiter", ["route"])
+SINGLE_FLIGHT_SHARED = Counter("single_flight_shared_total", "Callers that joined an in-flight query")
+MONGO_POOL_CONNECTIONS = Gauge("mongo_pool_connections", "MongoDB pool connections by state", ["state"])
+MONGO_POOL_WAITING = Gauge("mongo_pool_waiting", "Operations waiting to check out a MongoDB connection")
+
+class MetricsMiddleware:
+    """Plain ASGI middleware recording latency, size and concurrency per route template"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        size = 0
+        
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+        
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # The router stores the matched route in the scope; templates keep label cardinality bounded
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_REQUEST_DURATION.labels(scope["method"], path, str(status)).observe(time.perf_counter() - start)
+            HTTP_RESPONSE_SIZE.labels(scope["method"], path).observe(size)
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Per-collection command latency; pymongo calls this from its worker threads"""
+    
+    def __init__(self):
+        self._pending: Dict[tuple, str] = {}
+    
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        self._pending[(event.connection_id, event.request_id)] = target if isinstance(target, str) else ""
+    
+    def succeeded(self, event):
+        collection = self._pending.pop((event.connection_id, event.request_id), "")
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+    
+    def failed(self, event):
+        collection = self._pending.pop((event.connection_id, event.request_id), "")
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
+class MongoPoolMonitor(monitoring.ConnectionPoolListener):
+    """Connection counts summed over every server's pool, for saturation reporting"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+    
+    def _add(self, **deltas):
+        # Called from pymongo's worker threads
+        with self._lock:
+            for field, delta in deltas.items():
+                setattr(self, field, getattr(self, field) + delta)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open": self.open,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "saturation": round(self.in_use / MONGO_MAX_POOL_SIZE, 3) if MONGO_MAX_POOL_SIZE else 0.0,
+        }
+    
+    def connection_created(self, event):
+        self._add(open=1)
+    
+    def connection_closed(self, event):
+        self._add(open=-1)
+    
+    def connection_check_out_started(self, event):
+        self._add(waiting=1)
+    
+    def connection_check_out_failed(self, event):
+        self._add(waiting=-1)
+    
+    def connection_checked_out(self, event):
+        self._add(waiting=-1, in_use=1)
+    
+    def connection_checked_in(self, event):
+        self._add(in_use=-1)
+    
+    def connection_ready(self, event):
+        pass
+    
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        pass
+    
+    def pool_closed(self, event):
+        pass
+
+# MongoDB connection pool; 0 leaves a timeout unset
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 100))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 10))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 300000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 10000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 10000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 0))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', 0))
+
+mongo_pool_monitor = MongoPoolMonitor()
+MONGO_POOL_CONNECTIONS.labels("open").set_function(lambda: mongo_pool_monitor.open)
+MONGO_POOL_CONNECTIONS.labels("in_use").set_function(lambda: mongo_pool_monitor.in_use)
+MONGO_POOL_WAITING.set_function(lambda: mongo_pool_monitor.waiting)
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS or None,
+    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS or None,
+    event_listeners=[MongoCommandMetrics(), mongo_pool_monitor]
+)
 db = client[os.environ['DB_NAME']]
 
+# GridFS bucket holding uploaded file and media bytes
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 255 * 1024))
+
+@functools.lru_cache(maxsize=None)
+def get_fs_bucket() -> AsyncIOMotorGridFSBucket:
+    """The bucket is built on first use, from inside the serving loop: constructing one binds
+    the shared client to the current event loop, which at import time may be a different one"""
+    return AsyncIOMotorGridFSBucket(db, chunk_size_bytes=UPLOAD_CHUNK_SIZE)
+
+# Responsive image variants, rendered in a process pool
+Image.init()
+MEDIA_VARIANT_WIDTHS = sorted(int(w) for w in os.environ.get('MEDIA_VARIANT_WIDTHS', '320,640,1280').split(','))
+MEDIA_VARIANT_FORMATS = [
+    fmt for fmt in os.environ.get('MEDIA_VARIANT_FORMATS', 'webp,avif').split(',')
+    if fmt.upper() in Image.SAVE
+]
+MEDIA_VARIANT_QUALITY = int(os.environ.get('MEDIA_VARIANT_QUALITY', 80))
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+IMAGE_MAX_QUEUE = int(os.environ.get('IMAGE_MAX_QUEUE', 64))
+
+# Executor for CPU-heavy helpers (bcrypt, hashing, base64): "thread" or "process"
+CPU_EXECUTOR_KIND = os.environ.get('CPU_EXECUTOR_KIND', 'thread')
+CPU_EXECUTOR_WORKERS = int(os.environ.get('CPU_EXECUTOR_WORKERS', os.cpu_count() or 2))
+CPU_EXECUTOR_MAX_QUEUE = int(os.environ.get('CPU_EXECUTOR_MAX_QUEUE', 256))
+# Types Pillow can decode; variants of anything else are refused
+VARIANT_SOURCE_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif", "image/avif", "image/bmp", "image/tiff"}
+
+# Public CMS page cache bounds
+CMS_CACHE_TTL = float(os.environ.get('CMS_CACHE_TTL', 300))
+CMS_CACHE_MAX_PAGES = int(os.environ.get('CMS_CACHE_MAX_PAGES', 64))
+CMS_WATCH_ENABLED = os.environ.get('CMS_WATCH_ENABLED', 'true').lower() == 'true'
+CMS_WATCH_POLL_INTERVAL = float(os.environ.get('CMS_WATCH_POLL_INTERVAL', 2))
+
+def env_write_concern(prefix: str) -> WriteConcern:
+    """WriteConcern from PREFIX_W (a number or "majority") and PREFIX_J"""
+    w = os.environ.get(f'{prefix}_W', '1')
+    journal = os.environ.get(f'{prefix}_J', 'false').lower() == 'true'
+    return WriteConcern(w=int(w) if w.isdigit() else w, j=journal or None)
+
+# Submission writes: SUBMISSION_BATCHING (below) takes precedence, then
+# SUBMISSION_TRANSACTIONS, which needs a replica set and writes the submission
+# and its email log atomically; otherwise the log is inserted once the submission is
+# stored. EMAIL_LOG_WRITE_W=0 makes the log insert fire-and-forget outside transactions.
+SUBMISSION_TRANSACTIONS = os.environ.get('SUBMISSION_TRANSACTIONS', 'false').lower() == 'true'
+SUBMISSION_WRITE_CONCERN = env_write_concern('SUBMISSION_WRITE')
+EMAIL_LOG_WRITE_CONCERN = env_write_concern('EMAIL_LOG_WRITE')
+
+# Micro-batched submission ingestion for bursts: inserts are coalesced into
+# insert_many calls of up to SUBMISSION_BATCH_SIZE docs or SUBMISSION_BATCH_DELAY_MS
+SUBMISSION_BATCHING = os.environ.get('SUBMISSION_BATCHING', 'false').lower() == 'true'
+SUBMISSION_BATCH_SIZE = int(os.environ.get('SUBMISSION_BATCH_SIZE', 100))
+SUBMISSION_BATCH_DELAY_MS = float(os.environ.get('SUBMISSION_BATCH_DELAY_MS', 20))
+SUBMISSION_MAX_PENDING = int(os.environ.get('SUBMISSION_MAX_PENDING', 5000))
+
+# Email outbox delivery, disabled unless SMTP_HOST is set
+SMTP_HOST = os.environ.get('SMTP_HOST')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', 587))
+SMTP_USERNAME = os.environ.get('SMTP_USERNAME')
+SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')
+SMTP_STARTTLS = os.environ.get('SMTP_STARTTLS', 'false').lower() == 'true'
+SMTP_TIMEOUT = float(os.environ.get('SMTP_TIMEOUT', 30))
+EMAIL_FROM = os.environ.get('EMAIL_FROM', 'noreply@ridemedia.com')
+EMAIL_BATCH_SIZE = int(os.environ.get('EMAIL_BATCH_SIZE', 50))
+EMAIL_CONCURRENCY = int(os.environ.get('EMAIL_CONCURRENCY', 4))
+EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', 5))
+EMAIL_RETRY_BASE = float(os.environ.get('EMAIL_RETRY_BASE', 30))
+EMAIL_RETRY_MAX = float(os.environ.get('EMAIL_RETRY_MAX', 3600))
+EMAIL_LEASE_SECONDS = float(os.environ.get('EMAIL_LEASE_SECONDS', 300))
+EMAIL_POLL_INTERVAL = float(os.environ.get('EMAIL_POLL_INTERVAL', 5))
+
+# Streaming exports
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+EXPORT_FLUSH_BYTES = 64 * 1024
+
+ENSURE_INDEXES = os.environ.get('ENSURE_INDEXES', 'true').lower() == 'true'
+
+# Serve read routes straight from stored documents with orjson, skipping
+# response-model validation; the OpenAPI schema is unchanged
+FAST_READ_RESPONSES = os.environ.get('FAST_READ_RESPONSES', 'false').lower() == 'true'
+
+# Admin list pagination
+PAGE_SIZE_DEFAULT = 100
+PAGE_SIZE_MAX = 1000
+
+# Startup opens the pool's min connections and fills the CMS caches before /readyz passes
+WARMUP_ENABLED = os.environ.get('WARMUP_ENABLED', 'true').lower() == 'true'
+READY_PING_TIMEOUT = float(os.environ.get('READY_PING_TIMEOUT', 2))
+
+# Token buckets per client IP and route, written as "<burst>/<seconds to refill it>".
+# The memory backend limits each worker separately; "mongo" shares buckets between them
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 100000))
+RATE_LIMITS = {
+    "submit": os.environ.get('RATE_LIMIT_SUBMIT', '5/60'),
+    "upload": os.environ.get('RATE_LIMIT_UPLOAD', '10/60'),
+    "cms_read": os.environ.get('RATE_LIMIT_CMS_READ', '120/60'),
+}
+# Number of reverse proxies in front of the app that append to X-Forwarded-For. The deployment
+# serves /api through one ingress, so by default its entry is the client; without it every caller
+# would share the ingress address and one bucket. Set 0 when the app is reachable directly,
+# otherwise clients can pick their own address
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 1))
+
+# Largest id list a bulk admin request may name
+BULK_MAX_IDS = int(os.environ.get('BULK_MAX_IDS', 1000))
+
+# Dashboard stats are aggregated at most once per TTL; status changes invalidate them
+ADMIN_STATS_TTL = float(os.environ.get('ADMIN_STATS_TTL', 30))
+ADMIN_STATS_DAYS = int(os.environ.get('ADMIN_STATS_DAYS', 30))
+
+# Unreferenced content-addressed blobs are deleted after a grace period
+BLOB_GC_INTERVAL = float(os.environ.get('BLOB_GC_INTERVAL', 300))
+BLOB_GC_GRACE = float(os.environ.get('BLOB_GC_GRACE', 600))
+
+# Stored bytes never change for a given id, so raw downloads can be cached for a long time
+MEDIA_CACHE_MAX_AGE = int(os.environ.get('MEDIA_CACHE_MAX_AGE', 31536000))
+
+# Resumable uploads: every part but the last is part_size bytes, a whole number of GridFS chunks,
+# so parts map onto chunk numbers and can be written straight into fs.chunks in any order
+RESUMABLE_PART_SIZE = max(1, int(os.environ.get('RESUMABLE_PART_SIZE', 8 * 1024 ** 2)) // UPLOAD_CHUNK_SIZE) * UPLOAD_CHUNK_SIZE
+RESUMABLE_MAX_SIZE = int(os.environ.get('RESUMABLE_MAX_SIZE', 2 * 1024 ** 3))
+# Sessions without activity for this long are abandoned and their chunks removed
+RESUMABLE_SESSION_TTL = float(os.environ.get('RESUMABLE_SESSION_TTL', 24 * 3600))
+RESUMABLE_GC_INTERVAL = float(os.environ.get('RESUMABLE_GC_INTERVAL', 600))
+# A completion that hasn't finished in this many seconds (e.g. the worker died) can be retried
+RESUMABLE_COMPLETE_LEASE = float(os.environ.get('RESUMABLE_COMPLETE_LEASE', 300))
+
+# Retention: records older than these many days are archived, then deleted; 0 keeps them forever.
+# Timestamps are stored as ISO strings, which TTL indexes can't expire, so a sweeper does it.
+# Off unless configured: the default local ARCHIVE_DIR doesn't survive a redeploy on most hosts
+EMAIL_LOG_RETENTION_DAYS = int(os.environ.get('EMAIL_LOG_RETENTION_DAYS', 0))
+# Off by default: driver photo ids were not stored before, nor creatives attached before resumable
+# uploads, so older uploads look unused even when a submission needs them
+UPLOAD_RETENTION_DAYS = int(os.environ.get('UPLOAD_RETENTION_DAYS', 0))  # only uploads no submission uses
+RETENTION_INTERVAL = float(os.environ.get('RETENTION_INTERVAL', 3600))
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', 5000))
+# Where archived records go: "local" (ARCHIVE_DIR), "gridfs" (the archives bucket) or "none"
+ARCHIVE_STORE = os.environ.get('ARCHIVE_STORE', 'local')
+ARCHIVE_DIR = Path(os.environ.get('ARCHIVE_DIR', ROOT_DIR / 'archives'))
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+def verify_password(password: str, hashed: str) -> bool:
+    # Module-level so a process executor can pickle it
+    return pwd_context.verify(password, hashed)
+
 # Create the main app without a prefix
 app = FastAPI()
 
@@ -57,6 +391,7 @@ class DriverApplicationCreate(BaseModel):
     vehicle_year: str
     vehicle_make: str
     vehicle_model: str
+    photo_id: Optional[str] = None  # file_id from /upload
 
 class AdvertiserSubmission(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -79,14 +414,17 @@ class AdvertiserSubmissionCreate(BaseModel):
     budget_range: str
     cities: str
     ad_formats: str
+    creative_id: Optional[str] = None  # file_id from /upload or a completed resumable upload
 
 class FileUpload(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     filename: str
-    content: str  # base64 encoded
+    storage_id: str  # GridFS file id
+    sha256: Optional[str] = None
     content_type: str
+    size: int = 0
     uploaded_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
 class AdminLogin(BaseModel):
@@ -101,6 +439,26 @@ class AdminLoginResponse(BaseModel):
 class UpdateStatusRequest(BaseModel):
     status: str
 
+class SubmissionFilter(BaseModel):
+    status: Optional[str] = None
+    city: Optional[str] = None
+    platform: Optional[str] = None
+    submitted_from: Optional[str] = None
+    submitted_to: Optional[str] = None
+
+class BulkStatusUpdateRequest(BaseModel):
+    status: str
+    ids: Optional[List[str]] = Field(None, max_length=BULK_MAX_IDS)
+    filter: Optional[SubmissionFilter] = None
+
+class MediaFilter(BaseModel):
+    content_type: Optional[str] = None  # exact type, or a prefix like "image/"
+    uploaded_before: Optional[str] = None
+
+class BulkMediaDeleteRequest(BaseModel):
+    ids: Optional[List[str]] = Field(None, max_length=BULK_MAX_IDS)
+    filter: Optional[MediaFilter] = None
+
 class ContentBlock(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
@@ -116,14 +474,47 @@ class ContentBlockUpdate(BaseModel):
     content: Dict[str, Any]
     is_active: Optional[bool] = None
 
+class UploadSession(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    filename: str
+    content_type: str
+    size: int
+    sha256: Optional[str] = None  # expected digest of the whole file, checked on completion
+    part_size: int = RESUMABLE_PART_SIZE
+    storage_id: str = Field(default_factory=lambda: str(ObjectId()))  # GridFS file id the chunks belong to
+    parts: Dict[str, Dict[str, Any]] = Field(default_factory=dict)  # "3" -> {"size", "sha256"}
+    status: str = "open"  # "open", "completing", "complete"
+    lease_until: str = ""  # while "completing", when another complete call may take over
+    blob_id: Optional[str] = None  # GridFS id the blob reference was taken on, once registered
+    file_id: Optional[str] = None  # FileUpload id, chosen when completion first starts
+    created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    expires_at: str = ""
+    
+    @property
+    def part_count(self) -> int:
+        return max(1, -(-self.size // self.part_size))
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    content_type: str = "application/octet-stream"
+    size: int = Field(..., gt=0, le=RESUMABLE_MAX_SIZE)
+    sha256: Optional[str] = Field(None, pattern="^[0-9a-f]{64}$")
+
+class UploadCompleteRequest(BaseModel):
+    submission_id: Optional[str] = None  # advertiser submission to attach the file to as its creative
+
 class MediaFile(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     filename: str
-    data: str  # base64 encoded
+    storage_id: Optional[str] = None  # GridFS file id; unset until /admin/migrate-media moves legacy base64
+    sha256: Optional[str] = None
     content_type: str
     size: int = 0
+    variants: Dict[str, str] = Field(default_factory=dict)  # "640_webp" -> GridFS file id
     uploaded_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
 class EmailLog(BaseModel):
@@ -136,12 +527,239 @@ class EmailLog(BaseModel):
     body: str
     form_data: Dict[str, Any]
     timestamp: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
-    status: str = "logged"  # logged, sent, failed
+    status: str = "logged"  # logged, sending, sent, failed
+    attempts: int = 0
+    next_attempt_at: Optional[str] = None
+    last_error: Optional[str] = None
+    sent_at: Optional[str] = None
+
+content_blocks_adapter = TypeAdapter(List[ContentBlock])
+cms_pages_adapter = TypeAdapter(Dict[str, List[ContentBlock]])
+
+# ============ CMS Cache ============
+
+class PageCache:
+    """Bounded LRU of pre-serialized JSON responses with a TTL per entry.
+
+    Every key carries a version that invalidation bumps, so a reader that
+    started its query before a write cannot store the stale result it read.
+    """
+    
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._generation = 0
+        # Bumped by every invalidation, for derived caches that span all keys
+        self.revision = 0
+    
+    def version(self, key: str):
+        return self._generation, self._versions.get(key, 0)
+    
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, body = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return body
+    
+    def set(self, key: str, body: bytes, version):
+        if self.ttl <= 0 or self.max_entries <= 0 or version != self.version(key):
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, *keys: str):
+        self.revision += 1
+        for key in keys:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        self.revision += 1
+        self._generation += 1
+        self._versions.clear()
+        self._entries.clear()
+
+cms_page_cache = PageCache(ttl=CMS_CACHE_TTL, max_entries=CMS_CACHE_MAX_PAGES)
+
+def invalidate_for_change(change: Dict[str, Any]):
+    """Drop the cached pages touched by one content_blocks change event"""
+    doc = change.get("fullDocument")
+    updated = change.get("updateDescription", {}).get("updatedFields", {})
+    if change["operationType"] in ("insert", "replace", "update") and doc and "page" not in updated:
+        cms_page_cache.invalidate(doc["page"])
+    else:
+        # Deletes, moves between pages and unknown events don't tell us the old page
+        cms_page_cache.clear()
+
+async def watch_content_blocks():
+    """Invalidate this worker's page cache on writes made by any worker.
+
+    Tails a change stream on content_blocks, which needs a replica set (a
+    single node started with `--replSet rs0` and `rs.initiate()` is enough).
+    Standalone servers fall back to polling the `updated_at` high-water mark.
+    """
+    resume_token = None
+    opened = False
+    while True:
+        try:
+            async with db.content_blocks.watch(
+                full_document="updateLookup",
+                resume_after=resume_token
+            ) as stream:
+                if not opened:
+                    logger.info("CMS cache watcher following content_blocks change stream")
+                opened = True
+                async for change in stream:
+                    invalidate_for_change(change)
+                    resume_token = stream.resume_token
+        except OperationFailure as e:
+            if not opened:
+                logger.warning(f"Change streams unavailable ({e.code}), polling content_blocks instead")
+                await poll_content_blocks()
+                return
+            logger.warning(f"CMS change stream lost its resume point: {e}")
+            resume_token = None
+            cms_page_cache.clear()
+            # A lasting failure (e.g. revoked privileges) must not turn into a tight reopen loop
+            await asyncio.sleep(CMS_WATCH_POLL_INTERVAL)
+        except PyMongoError as e:
+            logger.warning(f"CMS change stream interrupted, reconnecting: {e}")
+            cms_page_cache.clear()
+            await asyncio.sleep(CMS_WATCH_POLL_INTERVAL)
+
+async def poll_content_blocks():
+    """Fallback watcher that invalidates pages whose blocks moved past the last seen `updated_at`"""
+    latest = await db.content_blocks.find_one({}, {"_id": 0, "updated_at": 1}, sort=[("updated_at", -1)])
+    high_water = latest["updated_at"] if latest else ""
+    while True:
+        await asyncio.sleep(CMS_WATCH_POLL_INTERVAL)
+        try:
+            changed = await db.content_blocks.find(
+                {"updated_at": {"$gt": high_water}},
+                {"_id": 0, "page": 1, "updated_at": 1}
+            ).to_list(None)
+        except PyMongoError as e:
+            logger.warning(f"CMS cache poll failed: {e}")
+            continue
+        if changed:
+            cms_page_cache.invalidate(*{block["page"] for block in changed})
+            high_water = max(block["updated_at"] for block in changed)
+
+def compress_snapshot(body: bytes) -> Dict[str, bytes]:
+    """Every encoding the snapshot is served in, compressed once at the highest level"""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31)  # gzip container
+    encodings = {"identity": body, "gzip": compressor.compress(body) + compressor.flush()}
+    if brotli is not None:
+        encodings["br"] = brotli.compress(body, quality=11)
+    return encodings
+
+def negotiate_encoding(header: str, available: Dict[str, bytes]) -> str:
+    """Pick br, then gzip, from an Accept-Encoding header, skipping codings refused with q=0"""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        q = params.strip().removeprefix("q=")
+        try:
+            if params and float(q) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    for encoding in ("br", "gzip"):
+        if encoding in available and (encoding in accepted or "*" in accepted):
+            return encoding
+    return "identity"
+
+class CmsSnapshot:
+    """All active blocks grouped by page, rebuilt only after the page cache sees a change.
+
+    The version is a hash of the content, so every worker hands out the same
+    ETag for the same blocks and clients can revalidate against any of them.
+    """
+    
+    def __init__(self, cache: PageCache, ttl: float):
+        self.cache = cache
+        self.ttl = ttl
+        self._built: Optional[tuple] = None
+        self._lock = asyncio.Lock()
+    
+    def _current(self) -> Optional[tuple]:
+        if self._built is None:
+            return None
+        revision, expires_at, version, encodings = self._built
+        if revision != self.cache.revision or expires_at < time.monotonic():
+            return None
+        return version, encodings
+    
+    async def get(self):
+        """Return (version, encodings), rebuilding once for all concurrent callers if stale"""
+        current = self._current()
+        if current:
+            return current
+        async with self._lock:
+            current = self._current()
+            if current:
+                return current
+            revision = self.cache.revision
+            blocks = await db.content_blocks.find(
+                {"is_active": True},
+                {"_id": 0}
+            ).sort([("page", 1), ("order", 1)]).to_list(None)
+            pages: Dict[str, List[ContentBlock]] = {}
+            for block in content_blocks_adapter.validate_python(blocks):
+                pages.setdefault(block.page, []).append(block)
+            pages_json = cms_pages_adapter.dump_json(pages)
+            version = hashlib.sha256(pages_json).hexdigest()[:32]
+            body = b'{"version":"' + version.encode() + b'","pages":' + pages_json + b'}'
+            encodings = await cpu_executor.run(compress_snapshot, body)
+            self._built = (revision, time.monotonic() + self.ttl, version, encodings)
+            return version, encodings
+
+cms_snapshot = CmsSnapshot(cms_page_cache, ttl=CMS_CACHE_TTL)
+
+class SingleFlight:
+    """Lets concurrent callers asking for the same key share one in-flight call"""
+    
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+    
+    async def do(self, key: str, fn, *args):
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(fn(*args))
+            self._calls[key] = call
+            call.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            SINGLE_FLIGHT_SHARED.inc()
+        # A caller that disconnects must not cancel the query for the others
+        return await asyncio.shield(call)
+
+single_flight = SingleFlight()
+
+async def load_page(page: str) -> bytes:
+    """Query and serialize one page's active blocks, storing them in the page cache"""
+    version = cms_page_cache.version(page)
+    blocks = await db.content_blocks.find(
+        {"page": page, "is_active": True},
+        {"_id": 0}
+    ).sort("order", 1).to_list(1000)
+    body = content_blocks_adapter.dump_json(content_blocks_adapter.validate_python(blocks))
+    cms_page_cache.set(page, body, version)
+    return body
 
 # ============ Helper Functions ============
 
-async def log_email(log_type: str, recipient: str, subject: str, body: str, form_data: Dict[str, Any]):
-    """Log email instead of sending for now"""
+def new_email_log(log_type: str, recipient: str, subject: str, body: str, form_data: Dict[str, Any]) -> EmailLog:
+    """Build an outbox entry that is due for delivery right away"""
     email_log = EmailLog(
         log_type=log_type,
         recipient=recipient,
@@ -149,9 +767,7 @@ async def log_email(log_type: str, recipient: str, subject: str, body: str, form
         body=body,
         form_data=form_data
     )
-    
-    doc = email_log.model_dump()
-    await db.email_logs.insert_one(doc)
+    email_log.next_attempt_at = email_log.timestamp
     
     logger.info(f"📧 EMAIL LOGGED: {log_type} - {subject}")
     logger.info(f"   To: {recipient}")
@@ -159,6 +775,1384 @@ async def log_email(log_type: str, recipient: str, subject: str, body: str, form
     
     return email_log
 
+async def save_submission(collection_name: str, doc: Dict[str, Any], email_log: EmailLog):
+    """Write a submission together with its notification email log.
+
+    Outside a transaction the log is only written after the submission is
+    stored; the outbox would otherwise mail about a submission that failed.
+    """
+    log_doc = email_log.model_dump()
+    if SUBMISSION_BATCHING:
+        submissions, email_logs = insert_batchers[collection_name], insert_batchers["email_logs"]
+        # Check both queues before enqueueing either so a rejection leaves nothing behind
+        if submissions.full() or email_logs.full():
+            raise HTTPException(
+                status_code=503,
+                detail="Too many submissions in progress, please retry",
+                headers={"Retry-After": "1"}
+            )
+        await submissions.enqueue(doc)
+        try:
+            log_ack = email_logs.enqueue(log_doc)
+        except asyncio.QueueFull:
+            log_ack = db.email_logs.with_options(write_concern=EMAIL_LOG_WRITE_CONCERN).insert_one(log_doc)
+        await log_ack
+    elif SUBMISSION_TRANSACTIONS:
+        async def write_both(session):
+            await db[collection_name].insert_one(doc, session=session)
+            await db.email_logs.insert_one(log_doc, session=session)
+        
+        async with await client.start_session() as session:
+            await session.with_transaction(write_both, write_concern=SUBMISSION_WRITE_CONCERN)
+    else:
+        await db[collection_name].with_options(write_concern=SUBMISSION_WRITE_CONCERN).insert_one(doc)
+        await db.email_logs.with_options(write_concern=EMAIL_LOG_WRITE_CONCERN).insert_one(log_doc)
+    outbox_wakeup.set()
+
+async def store_upload(file: UploadFile, content_type: str, private: bool = False):
+    """Stream an upload into GridFS chunk by chunk, returns (storage_id, size, sha256)"""
+    grid_in = get_fs_bucket().open_upload_stream(
+        file.filename or "upload",
+        metadata={"content_type": content_type}
+    )
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            await grid_in.write(chunk)
+            size += len(chunk)
+            UPLOAD_BYTES.inc(len(chunk))
+    except Exception:
+        await grid_in.abort()
+        raise
+    await grid_in.close()
+    sha256 = hasher.hexdigest()
+    storage_id = await register_blob(str(grid_in._id), sha256, size, content_type, private)
+    return storage_id, size, sha256
+
+async def store_base64(filename: str, content_type: str, data: str, private: bool = False):
+    """Decode a legacy base64 payload into GridFS piece by piece, returns (storage_id, size, sha256)"""
+    grid_in = get_fs_bucket().open_upload_stream(filename, metadata={"content_type": content_type})
+    # Slice on a multiple of 4 so every piece is independently decodable
+    step = (UPLOAD_CHUNK_SIZE // 3) * 4
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        for start in range(0, len(data), step):
+            chunk = await cpu_executor.run(base64.b64decode, data[start:start + step])
+            hasher.update(chunk)
+            await grid_in.write(chunk)
+            size += len(chunk)
+    except Exception:
+        await grid_in.abort()
+        raise
+    await grid_in.close()
+    sha256 = hasher.hexdigest()
+    storage_id = await register_blob(str(grid_in._id), sha256, size, content_type, private)
+    return storage_id, size, sha256
+
+async def register_blob(storage_id: str, sha256: str, size: int, content_type: str, private: bool = False) -> str:
+    """Take a reference on the blob with this hash, returns the GridFS id to use.
+
+    If identical bytes are already stored, the freshly written copy is dropped
+    and the existing file is shared instead. A private reference (an upload
+    rather than CMS media) marks the blob private for good.
+    """
+    update = {
+        "$inc": {"ref_count": 1},
+        "$setOnInsert": {
+            "storage_id": storage_id,
+            "size": size,
+            "content_type": content_type,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+    }
+    if private:
+        update["$set"] = {"private": True}
+    for attempt in range(2):
+        try:
+            blob = await db.blobs.find_one_and_update(
+                {"_id": sha256},
+                update,
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            break
+        except DuplicateKeyError:
+            # Two uploads of the same bytes raced to insert; the retry increments
+            if attempt:
+                raise
+    if blob["storage_id"] != storage_id:
+        await delete_stored_file(storage_id)
+    return blob["storage_id"]
+
+async def release_stored_files(docs: List[Dict[str, Any]]):
+    """Drop metadata records' claims on their bytes; the blob GC deletes them once unused"""
+    releases: Dict[str, int] = {}
+    for doc in docs:
+        if doc.get("sha256"):
+            releases[doc["sha256"]] = releases.get(doc["sha256"], 0) + 1
+    if releases:
+        released_at = datetime.now(timezone.utc).isoformat()
+        await db.blobs.bulk_write([
+            UpdateOne({"_id": sha256}, {"$inc": {"ref_count": -count}, "$set": {"released_at": released_at}})
+            for sha256, count in releases.items()
+        ], ordered=False)
+    # Stored before deduplication, so nothing else shares them
+    await delete_stored_files([doc.get("storage_id") for doc in docs if not doc.get("sha256")])
+
+async def collect_blobs():
+    """Periodically delete blobs that have had no references for BLOB_GC_GRACE seconds"""
+    while True:
+        await asyncio.sleep(BLOB_GC_INTERVAL)
+        cutoff = (datetime.now(timezone.utc) - timedelta(seconds=BLOB_GC_GRACE)).isoformat()
+        try:
+            while True:
+                # Atomic on ref_count, so an upload that revives the blob wins
+                blob = await db.blobs.find_one_and_delete(
+                    {"ref_count": {"$lte": 0}, "released_at": {"$lte": cutoff}}
+                )
+                if blob is None:
+                    break
+                await delete_stored_file(blob["storage_id"])
+                logger.info(f"Collected unreferenced blob {blob['_id']}")
+        except PyMongoError as e:
+            logger.warning(f"Blob GC pass failed: {e}")
+
+async def delete_stored_file(storage_id: Optional[str]):
+    """Remove a GridFS file, ignoring ones that are already gone"""
+    if not storage_id:
+        return
+    try:
+        await get_fs_bucket().delete(ObjectId(storage_id))
+    except gridfs.errors.NoFile:
+        logger.warning(f"GridFS file {storage_id} already removed")
+
+async def delete_stored_files(storage_ids: List[Optional[str]]):
+    """Remove many GridFS files with one delete per bucket collection, files first like GridFS does"""
+    object_ids = [ObjectId(storage_id) for storage_id in storage_ids if storage_id]
+    if not object_ids:
+        return
+    await db["fs.files"].delete_many({"_id": {"$in": object_ids}})
+    await db["fs.chunks"].delete_many({"files_id": {"$in": object_ids}})
+
+def parse_range(range_header: Optional[str], length: int):
+    """Parse a single `bytes=` range, returns (start, end), None for the full body, or raises 416"""
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        # Multi-range and unknown units are answered with the full body
+        return None
+    start_str, _, end_str = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else length - 1
+        else:
+            suffix = int(end_str)
+            if suffix == 0:
+                raise ValueError
+            start = max(length - suffix, 0)
+            end = length - 1
+    except ValueError:
+        return None
+    if start >= length or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{length}"}
+        )
+    return start, min(end, length - 1)
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match / If-Range header against our ETag"""
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+async def stored_file_response(request: Request, doc: Dict[str, Any], public: bool = True):
+    """Stream a stored file with Range, ETag and conditional GET support.
+
+    Only public files (CMS media and its blobs) may sit in shared caches; private
+    ones such as driver ID scans are revalidated by the browser each time.
+    """
+    etag = f'"{doc.get("sha256") or doc["storage_id"]}"'
+    last_modified = datetime.fromisoformat(doc["uploaded_at"]).replace(microsecond=0)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": f"public, max-age={MEDIA_CACHE_MAX_AGE}, immutable" if public else "private, no-cache",
+        "Accept-Ranges": "bytes",
+    }
+    
+    # Conditional GET is answered from metadata alone, before touching GridFS
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+    elif if_modified_since:
+        try:
+            if last_modified <= parsedate_to_datetime(if_modified_since):
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+    
+    try:
+        grid_out = await get_fs_bucket().open_download_stream(ObjectId(doc["storage_id"]))
+    except gridfs.errors.NoFile:
+        raise HTTPException(status_code=404, detail="Stored file not found")
+    
+    length = grid_out.length
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or etag_matches(if_range, etag):
+        byte_range = parse_range(request.headers.get("range"), length)
+    
+    status_code = 200
+    start, end = 0, length - 1
+    if byte_range:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+    headers["Content-Length"] = str(end - start + 1)
+    
+    async def body():
+        grid_out.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await grid_out.read(min(UPLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    
+    return StreamingResponse(body(), status_code=status_code, media_type=doc["content_type"], headers=headers)
+
+# ============ Indexes ============
+
+def id_index():
+    return IndexModel([("id", ASCENDING)], unique=True, name="id_unique")
+
+# Every index the queries in this module rely on, created idempotently at startup
+INDEXES: Dict[str, List[IndexModel]] = {
+    "driver_applications": [
+        id_index(),
+        IndexModel([("submitted_at", DESCENDING), ("id", DESCENDING)], name="submitted_at_id"),
+        IndexModel([("status", ASCENDING), ("submitted_at", DESCENDING)], name="status_submitted_at"),
+        IndexModel([("photo_id", ASCENDING)], name="photo_id", sparse=True),
+        # Names, emails and places shouldn't be stemmed, hence language "none"
+        IndexModel(
+            [("name", TEXT), ("email", TEXT), ("city", TEXT), ("vehicle_make", TEXT), ("vehicle_model", TEXT)],
+            weights={"name": 10, "email": 10, "city": 3, "vehicle_make": 2, "vehicle_model": 2},
+            default_language="none",
+            name="search_text"
+        ),
+    ],
+    "advertiser_submissions": [
+        id_index(),
+        IndexModel([("submitted_at", DESCENDING), ("id", DESCENDING)], name="submitted_at_id"),
+        IndexModel([("status", ASCENDING), ("submitted_at", DESCENDING)], name="status_submitted_at"),
+        IndexModel([("creative_id", ASCENDING)], name="creative_id", sparse=True),
+        IndexModel(
+            [("company_name", TEXT), ("contact_name", TEXT), ("email", TEXT), ("cities", TEXT)],
+            weights={"company_name": 10, "contact_name": 5, "email": 10, "cities": 2},
+            default_language="none",
+            name="search_text"
+        ),
+    ],
+    "email_logs": [
+        id_index(),
+        IndexModel([("timestamp", DESCENDING), ("id", DESCENDING)], name="timestamp_id"),
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt_at"),
+        IndexModel(
+            [("subject", TEXT), ("body", TEXT)],
+            weights={"subject": 5, "body": 1},
+            name="search_text"
+        ),
+    ],
+    "content_blocks": [
+        id_index(),
+        IndexModel([("page", ASCENDING), ("is_active", ASCENDING), ("order", ASCENDING)], name="page_active_order"),
+        IndexModel([("updated_at", DESCENDING), ("id", DESCENDING)], name="updated_at_id"),
+    ],
+    "media_files": [
+        id_index(),
+        IndexModel([("uploaded_at", DESCENDING)], name="uploaded_at"),
+    ],
+    "file_uploads": [
+        id_index(),
+        IndexModel([("uploaded_at", ASCENDING), ("id", ASCENDING)], name="uploaded_at_id"),
+    ],
+    "blobs": [
+        IndexModel([("ref_count", ASCENDING), ("released_at", ASCENDING)], name="ref_count_released_at"),
+    ],
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ],
+    "upload_sessions": [
+        id_index(),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at"),
+    ],
+    # The index GridFS itself creates; resumable parts are written to fs.chunks before the bucket may have
+    "fs.chunks": [
+        IndexModel([("files_id", ASCENDING), ("n", ASCENDING)], unique=True, name="files_id_1_n_1"),
+    ],
+}
+
+# Representative hot queries whose plans the index report explains
+INDEX_PROBES: Dict[str, List[tuple]] = {
+    "driver_applications": [
+        ({"id": ""}, None),
+        ({"status": "pending"}, [("submitted_at", -1)]),
+        ({"$text": {"$search": "toyota"}}, None),
+    ],
+    "advertiser_submissions": [
+        ({"id": ""}, None),
+        ({"status": "pending"}, [("submitted_at", -1)]),
+        ({"$text": {"$search": "media"}}, None),
+    ],
+    "email_logs": [({}, [("timestamp", -1), ("id", -1)]), ({"$text": {"$search": "application"}}, None)],
+    "content_blocks": [({"page": "home", "is_active": True}, [("order", 1)])],
+    "media_files": [({"id": ""}, None), ({}, [("uploaded_at", -1)])],
+    "file_uploads": [({"id": ""}, None)],
+    "blobs": [({"ref_count": {"$lte": 0}, "released_at": {"$lte": ""}}, None)],
+}
+
+async def ensure_indexes():
+    """Create the registered indexes; existing ones with the same spec are left alone"""
+    for collection, indexes in INDEXES.items():
+        try:
+            await db[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            # e.g. duplicate ids in old data or a conflicting manual index
+            logger.error(f"Could not create indexes on {collection}: {e}")
+        except PyMongoError as e:
+            # Unreachable server: start anyway, the next deploy or restart creates them
+            logger.error(f"Skipping index creation, MongoDB unavailable: {e}")
+            return
+
+def plan_stages(plan: Dict[str, Any]) -> List[str]:
+    stages = [plan.get("stage")]
+    for child in plan.get("inputStages", []) + [plan.get("inputStage")]:
+        if child:
+            stages.extend(plan_stages(child))
+    return stages
+
+# ============ Pagination & Filters ============
+
+def encode_cursor(sort_value: Any, doc_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort_value, doc_id]).encode()).decode()
+
+def decode_cursor(cursor: str, sort_type: Any = str):
+    """(sort value, id) from a cursor; both are checked so a crafted one can't inject query operators"""
+    try:
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(sort_value, sort_type) or isinstance(sort_value, bool) or not isinstance(doc_id, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return sort_value, doc_id
+
+def field_names(fields: str) -> List[str]:
+    """Requested `fields`, minus _id (not JSON serializable) and operator-like names"""
+    names = (name.strip() for name in fields.split(","))
+    return [name for name in names if name and name != "_id" and not name.startswith("$")]
+
+def date_range(field: str, date_from: Optional[str], date_to: Optional[str]) -> Dict[str, Any]:
+    """Range filter on an ISO timestamp field, compared as strings like they are stored"""
+    bounds = {}
+    if date_from:
+        bounds["$gte"] = date_from
+    if date_to:
+        bounds["$lte"] = date_to
+    return {field: bounds} if bounds else {}
+
+def driver_filters(
+    status: Optional[str] = None,
+    city: Optional[str] = None,
+    platform: Optional[str] = None,
+    submitted_from: Optional[str] = None,
+    submitted_to: Optional[str] = None
+) -> Dict[str, Any]:
+    query = {k: v for k, v in (("status", status), ("city", city), ("platform", platform)) if v}
+    query.update(date_range("submitted_at", submitted_from, submitted_to))
+    return query
+
+def advertiser_filters(
+    status: Optional[str] = None,
+    city: Optional[str] = None,
+    submitted_from: Optional[str] = None,
+    submitted_to: Optional[str] = None
+) -> Dict[str, Any]:
+    query = {"status": status} if status else {}
+    if city:
+        # `cities` is free text listing every target market
+        query["cities"] = {"$regex": re.escape(city), "$options": "i"}
+    query.update(date_range("submitted_at", submitted_from, submitted_to))
+    return query
+
+def email_log_filters(
+    status: Optional[str] = None,
+    log_type: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None
+) -> Dict[str, Any]:
+    query = {k: v for k, v in (("status", status), ("log_type", log_type)) if v}
+    query.update(date_range("timestamp", date_from, date_to))
+    return query
+
+async def paginate(collection, query: Dict[str, Any], sort_field: str, limit: int,
+                   cursor: Optional[str], fields: Optional[str]):
+    """Keyset page ordered by (sort_field, id) descending, returns (docs, next_cursor)"""
+    if cursor:
+        last_value, last_id = decode_cursor(cursor)
+        query = {"$and": [query, {"$or": [
+            {sort_field: {"$lt": last_value}},
+            {sort_field: last_value, "id": {"$lt": last_id}}
+        ]}]}
+    
+    projection = {"_id": 0}
+    if fields:
+        projection.update({name: 1 for name in field_names(fields)})
+        projection.update({"id": 1, sort_field: 1})
+    
+    docs = await collection.find(query, projection).sort(
+        [(sort_field, -1), ("id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+    
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1][sort_field], docs[-1]["id"])
+    return docs, next_cursor
+
+async def paginate_created(collection, query: Dict[str, Any], limit: int,
+                           cursor: Optional[str], fields: Optional[str]):
+    """Keyset page in creation order (ascending _id), for lists whose rows must not move when edited"""
+    if cursor:
+        last_oid, _ = decode_cursor(cursor)
+        if not ObjectId.is_valid(last_oid):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = {"$and": [query, {"_id": {"$gt": ObjectId(last_oid)}}]}
+    
+    projection = None
+    if fields:
+        projection = {name: 1 for name in field_names(fields)}
+        projection["id"] = 1
+    
+    docs = await collection.find(query, projection).sort("_id", 1).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(str(docs[-1]["_id"]), docs[-1]["id"])
+    for doc in docs:
+        del doc["_id"]
+    return docs, next_cursor
+
+def page_response(docs: List[Dict[str, Any]], next_cursor: Optional[str],
+                  fields: Optional[str], response: Response):
+    """Return a page as a plain list, with the next cursor in the X-Next-Cursor header"""
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if fields or FAST_READ_RESPONSES:
+        # Projected documents are partial, so they can't go through the response model
+        return ORJSONResponse(docs, headers=headers)
+    response.headers.update(headers)
+    return docs
+
+def trusted_response(content: Any):
+    """Skip response-model validation for documents that were validated on write"""
+    return ORJSONResponse(content) if FAST_READ_RESPONSES else content
+
+# ============ Submission Batching ============
+
+class InsertBatcher:
+    """Coalesces single inserts into one collection into unordered insert_many calls.
+
+    Each caller waits on a future that resolves once its own document's batch
+    has been acknowledged (or fails with that document's write error).
+    """
+    
+    def __init__(self, collection, max_batch: int, max_delay: float, max_pending: int):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+    
+    def full(self) -> bool:
+        return self.queue.full()
+    
+    def enqueue(self, doc: Dict[str, Any]) -> asyncio.Future:
+        """Queue a document without yielding; await the returned future for the ack"""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((doc, future))
+        return future
+    
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        batch: List[tuple] = []
+        try:
+            while True:
+                batch = [await self.queue.get()]
+                deadline = loop.time() + self.max_delay
+                while len(batch) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                ready, batch = batch, []
+                # Shielded so a shutdown mid-write still answers this batch's callers
+                await asyncio.shield(self.flush(ready))
+        except asyncio.CancelledError:
+            # Don't strand callers at shutdown, including the batch being gathered
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            if batch:
+                await self.flush(batch)
+            raise
+    
+    async def flush(self, batch: List[tuple]):
+        errors: Dict[int, Dict[str, Any]] = {}
+        try:
+            await self.collection.insert_many([doc for doc, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            if e.details.get("writeConcernErrors"):
+                self._fail(batch, e)
+                return
+            errors = {error["index"]: error for error in e.details.get("writeErrors", [])}
+        except PyMongoError as e:
+            self._fail(batch, e)
+            return
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue  # the caller went away
+            if index in errors:
+                error = errors[index]
+                future.set_exception(WriteError(error.get("errmsg"), error.get("code"), error))
+            else:
+                future.set_result(None)
+    
+    @staticmethod
+    def _fail(batch: List[tuple], exc: Exception):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(exc)
+
+def make_batcher(collection_name: str, write_concern: WriteConcern) -> InsertBatcher:
+    return InsertBatcher(
+        db[collection_name].with_options(write_concern=write_concern),
+        max_batch=SUBMISSION_BATCH_SIZE,
+        max_delay=SUBMISSION_BATCH_DELAY_MS / 1000,
+        max_pending=SUBMISSION_MAX_PENDING
+    )
+
+insert_batchers: Dict[str, InsertBatcher] = {}
+
+# ============ Email Outbox ============
+
+# Set whenever an email is queued so the worker doesn't wait for its next poll
+outbox_wakeup = asyncio.Event()
+
+class SMTPPool:
+    """Reuses up to `size` SMTP connections; smtplib blocks, so sends run in threads"""
+    
+    def __init__(self, size: int):
+        self._idle: List[smtplib.SMTP] = []
+        self._slots = asyncio.Semaphore(size)
+    
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        if SMTP_STARTTLS:
+            conn.starttls()
+        if SMTP_USERNAME:
+            conn.login(SMTP_USERNAME, SMTP_PASSWORD)
+        return conn
+    
+    def _send(self, conn: Optional[smtplib.SMTP], message: EmailMessage) -> smtplib.SMTP:
+        if conn is not None:
+            try:
+                conn.send_message(message)
+                return conn
+            except smtplib.SMTPServerDisconnected:
+                conn.close()  # the server dropped an idle connection, retry on a fresh one
+            except Exception:
+                conn.close()
+                raise
+        conn = self._connect()
+        try:
+            conn.send_message(message)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+    
+    async def send(self, message: EmailMessage):
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else None
+            conn = await asyncio.to_thread(self._send, conn, message)
+            self._idle.append(conn)
+    
+    def close(self):
+        while self._idle:
+            conn = self._idle.pop()
+            try:
+                conn.quit()
+            except smtplib.SMTPException:
+                conn.close()
+
+smtp_pool = SMTPPool(EMAIL_CONCURRENCY)
+
+async def claim_email(now: datetime) -> Optional[Dict[str, Any]]:
+    """Atomically take one due email, or one whose previous claim expired"""
+    now_iso = now.isoformat()
+    claim = {"status": "sending", "lease_until": (now + timedelta(seconds=EMAIL_LEASE_SECONDS)).isoformat()}
+    doc = await db.email_logs.find_one_and_update(
+        {"$or": [
+            {"status": "logged", "next_attempt_at": {"$lte": now_iso}},
+            {"status": "sending", "lease_until": {"$lte": now_iso}},
+        ]},
+        {"$set": claim, "$inc": {"attempts": 1}},
+        projection={"_id": 0},
+        sort=[("next_attempt_at", 1)]
+    )
+    if doc is not None:
+        doc.update(claim, attempts=doc.get("attempts", 0) + 1)
+    return doc
+
+async def deliver_email(doc: Dict[str, Any]):
+    now = datetime.now(timezone.utc)
+    try:
+        message = EmailMessage()
+        message["From"] = EMAIL_FROM
+        message["To"] = doc["recipient"]
+        message["Subject"] = doc["subject"]
+        message.set_content(doc["body"])
+        await smtp_pool.send(message)
+    except Exception as e:
+        # Anything the send raises counts as a failed attempt, so a bad message can't loop on its lease
+        if doc["attempts"] >= EMAIL_MAX_ATTEMPTS:
+            update = {"status": "failed"}
+            logger.error(f"Email {doc['id']} failed after {doc['attempts']} attempts: {e}")
+        else:
+            delay = min(EMAIL_RETRY_BASE * 2 ** (doc["attempts"] - 1), EMAIL_RETRY_MAX)
+            update = {"status": "logged", "next_attempt_at": (now + timedelta(seconds=delay)).isoformat()}
+            logger.warning(f"Email {doc['id']} attempt {doc['attempts']} failed, retrying in {delay:.0f}s: {e}")
+        update["last_error"] = str(e)
+    else:
+        update = {"status": "sent", "sent_at": now.isoformat(), "last_error": None}
+    await db.email_logs.update_one({"id": doc["id"]}, {"$set": update, "$unset": {"lease_until": ""}})
+
+async def run_email_outbox():
+    """Deliver queued email_logs in batches until cancelled.
+
+    Point SMTP_HOST/SMTP_PORT at a local stand-in such as
+    `python -m aiosmtpd -n -l localhost:8025` to exercise it end to end.
+    """
+    while True:
+        outbox_wakeup.clear()
+        try:
+            now = datetime.now(timezone.utc)
+            batch = []
+            while len(batch) < EMAIL_BATCH_SIZE:
+                doc = await claim_email(now)
+                if doc is None:
+                    break
+                batch.append(doc)
+            if batch:
+                await asyncio.gather(*(deliver_email(doc) for doc in batch))
+                continue
+        except Exception as e:
+            # Keep the worker alive; claimed emails are retried once their lease expires
+            logger.warning(f"Email outbox poll failed: {e}")
+        try:
+            await asyncio.wait_for(outbox_wakeup.wait(), EMAIL_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+# ============ CPU Offload ============
+
+class OffloadExecutor:
+    """Runs CPU-heavy callables off the event loop with bounded concurrency.
+
+    At most `max_workers` calls run at once; up to `max_queue` more wait for a
+    slot, and beyond that `run` answers 503 rather than letting work pile up.
+    """
+    
+    def __init__(self, name: str, kind: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._slots = asyncio.Semaphore(max_workers)
+        self.queued = 0
+        self.peak_queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+    
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                # Forking would copy the event loop, Motor's pool and its monitor threads into the
+                # workers; forkserver starts them from a clean process that only imports this module
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("forkserver")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+    
+    async def run(self, fn, *args):
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please retry",
+                headers={"Retry-After": "1"}
+            )
+        self.queued += 1
+        self.peak_queued = max(self.peak_queued, self.queued)
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.busy_seconds += time.perf_counter() - start
+            self.in_flight -= 1
+            self.completed += 1
+            self._slots.release()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "busy_seconds": round(self.busy_seconds, 3),
+        }
+    
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+cpu_executor = OffloadExecutor("cpu", CPU_EXECUTOR_KIND, CPU_EXECUTOR_WORKERS, CPU_EXECUTOR_MAX_QUEUE)
+image_executor = OffloadExecutor("image", "process", IMAGE_WORKERS, IMAGE_MAX_QUEUE)
+executors = (cpu_executor, image_executor)
+
+class ExecutorCollector:
+    """Exposes executor queue depth and concurrency at scrape time"""
+    
+    def collect(self):
+        queued = GaugeMetricFamily("offload_executor_queued", "Calls waiting for an executor slot", labels=["executor"])
+        in_flight = GaugeMetricFamily("offload_executor_in_flight", "Calls running on an executor", labels=["executor"])
+        rejected = GaugeMetricFamily("offload_executor_rejected", "Calls refused because the queue was full", labels=["executor"])
+        for executor in executors:
+            queued.add_metric([executor.name], executor.queued)
+            in_flight.add_metric([executor.name], executor.in_flight)
+            rejected.add_metric([executor.name], executor.rejected)
+        yield queued
+        yield in_flight
+        yield rejected
+
+REGISTRY.register(ExecutorCollector())
+
+# ============ Image Variants ============
+
+def render_variant(data: bytes, width: Optional[int], fmt: str, quality: int) -> bytes:
+    """Resize (never upscale) and re-encode an image; runs in a worker process"""
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+        if width and width < image.width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, format=fmt.upper(), quality=quality)
+        return out.getvalue()
+
+def variant_key(width: Optional[int], fmt: str) -> str:
+    # No dots: the key is used in dotted update paths
+    return f"{width or 'full'}_{fmt}"
+
+# In-flight renders, so concurrent requests for the same variant share one job
+variant_jobs: Dict[tuple, asyncio.Future] = {}
+
+async def build_variant(media: Dict[str, Any], width: Optional[int], fmt: str) -> str:
+    """Render one variant of a media image into GridFS, returns its storage id"""
+    grid_out = await get_fs_bucket().open_download_stream(ObjectId(media["storage_id"]))
+    data = await grid_out.read()
+    rendered = await image_executor.run(render_variant, data, width, fmt, MEDIA_VARIANT_QUALITY)
+    key = variant_key(width, fmt)
+    storage_id = str(await get_fs_bucket().upload_from_stream(
+        f"{key}.{media['filename']}", rendered, metadata={"content_type": f"image/{fmt}"}
+    ))
+    # Keep the first variant if another worker raced us to it
+    result = await db.media_files.update_one(
+        {"id": media["id"], f"variants.{key}": {"$exists": False}},
+        {"$set": {f"variants.{key}": storage_id}}
+    )
+    if result.modified_count == 0:
+        await delete_stored_file(storage_id)
+        current = await db.media_files.find_one({"id": media["id"]}, {"_id": 0, "variants": 1})
+        storage_id = ((current or {}).get("variants") or {}).get(key)
+        if storage_id is None:
+            raise HTTPException(status_code=404, detail="Media file not found")
+    return storage_id
+
+async def get_variant(media: Dict[str, Any], width: Optional[int], fmt: str) -> str:
+    """Storage id of a variant, rendering and memoizing it on first use"""
+    key = variant_key(width, fmt)
+    storage_id = (media.get("variants") or {}).get(key)
+    if storage_id:
+        return storage_id
+    job_key = (media["id"], key)
+    job = variant_jobs.get(job_key)
+    if job is None:
+        job = asyncio.ensure_future(build_variant(media, width, fmt))
+        variant_jobs[job_key] = job
+        job.add_done_callback(lambda _: variant_jobs.pop(job_key, None))
+    return await asyncio.shield(job)
+
+async def build_all_variants(media: Dict[str, Any]):
+    """Pre-render every configured variant after an upload"""
+    for width in MEDIA_VARIANT_WIDTHS:
+        for fmt in MEDIA_VARIANT_FORMATS:
+            try:
+                await get_variant(media, width, fmt)
+            except Exception as e:
+                logger.warning(f"Could not render {variant_key(width, fmt)} for media {media['id']}: {e}")
+                return
+
+# ============ Exports ============
+
+async def export_chunks(cursor, columns: List[str], fmt: str):
+    """Render cursor rows as CSV or NDJSON, yielding ~EXPORT_FLUSH_BYTES at a time"""
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+    async for doc in cursor:
+        if writer:
+            writer.writerow(doc)
+        else:
+            buffer.write(json.dumps(doc, default=str) + "\n")
+        if buffer.tell() >= EXPORT_FLUSH_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+async def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_response(collection, query: Dict[str, Any], model, name: str, fmt: str, gzip: bool):
+    """Stream every matching row, newest first, without materializing the result"""
+    cursor = collection.find(query, {"_id": 0}).sort(
+        [("submitted_at", -1), ("id", -1)]
+    ).batch_size(EXPORT_BATCH_SIZE)
+    chunks = export_chunks(cursor, list(model.model_fields), fmt)
+    
+    extension = "csv" if fmt == "csv" else "ndjson"
+    headers = {
+        "Content-Disposition": f'attachment; filename="{name}_{datetime.now(timezone.utc).date()}.{extension}"'
+    }
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+# ============ Bulk Operations ============
+
+def bulk_target(ids: Optional[List[str]], filter_model: Optional[BaseModel]):
+    """Reject requests that name both or neither of an id list and a non-empty filter"""
+    if (ids is None) == (filter_model is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of ids or filter")
+    if filter_model is not None and not filter_model.model_dump(exclude_none=True):
+        raise HTTPException(status_code=400, detail="Filter must set at least one field")
+
+async def bulk_update_status(collection, request: BulkStatusUpdateRequest, filters) -> Dict[str, Any]:
+    """Apply one status to an id list or filter with a single update_many.
+
+    Id lists get a result per id; filters, which may match any number of
+    documents, get counts only.
+    """
+    bulk_target(request.ids, request.filter)
+    if request.ids is not None:
+        ids = list(dict.fromkeys(request.ids))
+        current = await collection.find(
+            {"id": {"$in": ids}},
+            {"_id": 0, "id": 1, "status": 1}
+        ).to_list(None)
+        statuses = {doc["id"]: doc.get("status") for doc in current}
+        result = await collection.update_many({"id": {"$in": ids}}, {"$set": {"status": request.status}})
+        results = [
+            {"id": item_id, "result": "not_found" if item_id not in statuses
+             else "unchanged" if statuses[item_id] == request.status else "updated"}
+            for item_id in ids
+        ]
+    else:
+        query = filters(**request.filter.model_dump(exclude_none=True))
+        result = await collection.update_many(query, {"$set": {"status": request.status}})
+        results = None
+    
+    if result.modified_count:
+        admin_stats_cache.invalidate("stats")
+    response = {"matched": result.matched_count, "modified": result.modified_count}
+    if results is not None:
+        response["results"] = results
+    return response
+
+def media_filter_query(media_filter: MediaFilter) -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    if media_filter.content_type:
+        if media_filter.content_type.endswith("/"):
+            query["content_type"] = {"$regex": f"^{re.escape(media_filter.content_type)}"}
+        else:
+            query["content_type"] = media_filter.content_type
+    query.update(date_range("uploaded_at", None, media_filter.uploaded_before))
+    return query
+
+# ============ Rate Limiting ============
+
+def parse_rate(spec: str):
+    """Parse "<burst>/<seconds>" into (tokens per second, burst)"""
+    burst, _, seconds = spec.partition("/")
+    return int(burst) / float(seconds or 1), int(burst)
+
+class MemoryRateLimitBackend:
+    """Token buckets in this worker's memory, least recently used keys evicted past max_keys"""
+    
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+    
+    async def take(self, key: str, rate: float, burst: int):
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+class MongoRateLimitBackend:
+    """Token buckets shared by every worker, refilled and spent in one atomic pipeline update.
+
+    Idle buckets are full again after burst / rate seconds, so a TTL index
+    drops them from then on.
+    """
+    
+    async def take(self, key: str, rate: float, burst: int):
+        now = time.time()
+        refilled = {"$min": [burst, {"$add": [
+            {"$ifNull": ["$tokens", burst]},
+            {"$multiply": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, rate]}
+        ]}]}
+        bucket = await db.rate_limits.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now}},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                {"$set": {
+                    "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "expires_at": datetime.now(timezone.utc) + timedelta(seconds=burst / rate)
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        allowed = bucket["allowed"]
+        return allowed, 0.0 if allowed else (1 - bucket["tokens"]) / rate
+
+RATE_LIMIT_BACKENDS = {"memory": lambda: MemoryRateLimitBackend(RATE_LIMIT_MAX_KEYS), "mongo": MongoRateLimitBackend}
+rate_limit_backend = RATE_LIMIT_BACKENDS[RATE_LIMIT_BACKEND]()
+
+def client_ip(request: Request) -> str:
+    """The caller's address, taken from X-Forwarded-For only as far as trusted proxies wrote it"""
+    forwarded = request.headers.get("x-forwarded-for")
+    if TRUSTED_PROXY_HOPS and forwarded:
+        hops = [hop.strip() for hop in forwarded.split(",")]
+        return hops[max(len(hops) - TRUSTED_PROXY_HOPS, 0)]
+    return request.client.host if request.client else "unknown"
+
+def rate_limit(name: str):
+    """Dependency spending one token from the caller's bucket for this route, 429 when empty"""
+    rate, burst = parse_rate(RATE_LIMITS[name])
+    
+    async def check(request: Request):
+        if not RATE_LIMIT_ENABLED or burst <= 0:
+            return
+        route = request.scope["route"].path
+        try:
+            allowed, retry_after = await rate_limit_backend.take(f"{route}|{client_ip(request)}", rate, burst)
+        except PyMongoError as e:
+            # Fail open: a limiter outage must not take the public forms down with it
+            logger.warning(f"Rate limiter unavailable, allowing request: {e}")
+            return
+        if not allowed:
+            RATE_LIMITED.labels(route).inc()
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+                headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+            )
+    
+    return check
+
+# ============ Admin Stats ============
+
+admin_stats_cache = PageCache(ttl=ADMIN_STATS_TTL, max_entries=1)
+
+async def submission_stats(collection, breakdowns: Dict[str, str], since: str) -> Dict[str, Any]:
+    """Total, per-field counts and a daily series for one submissions collection in one $facet"""
+    facets = {
+        name: [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}, {"$sort": {"count": -1}}]
+        for name, field in breakdowns.items()
+    }
+    facets["total"] = [{"$count": "count"}]
+    facets["daily"] = [
+        {"$match": {"submitted_at": {"$gte": since}}},
+        {"$group": {"_id": {"$substrCP": ["$submitted_at", 0, 10]}, "count": {"$sum": 1}}},
+        {"$sort": {"_id": 1}},
+    ]
+    projection = {field: 1 for field in breakdowns.values()}
+    projection.update(_id=0, submitted_at=1)
+    result = (await collection.aggregate([{"$project": projection}, {"$facet": facets}]).to_list(1))[0]
+    
+    total = result["total"][0]["count"] if result["total"] else 0
+    stats: Dict[str, Any] = {"total": total}
+    for name in breakdowns:
+        stats[name] = {str(row["_id"]): row["count"] for row in result[name]}
+    stats["daily"] = [{"date": row["_id"], "count": row["count"]} for row in result["daily"]]
+    # Every submission starts out pending, so approved over total is the pending -> approved rate
+    stats["conversion_rate"] = round(stats["by_status"].get("approved", 0) / total, 4) if total else 0.0
+    return stats
+
+# ============ Search ============
+
+# Collection and facet fields per search scope; facets double as the allowed filters
+SEARCH_SCOPES: Dict[str, tuple] = {
+    "drivers": ("driver_applications", ["status", "city", "platform"]),
+    "advertisers": ("advertiser_submissions", ["status", "budget_range"]),
+    "email_logs": ("email_logs", ["status", "log_type"]),
+}
+SEARCH_FACET_LIMIT = 20
+
+async def search_collection(collection, q: str, filters: Dict[str, Any], facets: List[str],
+                            limit: int, cursor: Optional[str]):
+    """Text-score ranked page plus, on the first page only, total and facet counts.
+
+    Pages are keyed on (score, id) so deep pages cost the same as the first.
+    Returns (docs, next_cursor, total, facet_counts).
+    """
+    page: List[Dict[str, Any]] = []
+    if cursor:
+        last_score, last_id = decode_cursor(cursor, (int, float))
+        page.append({"$match": {"$or": [
+            {"score": {"$lt": last_score}},
+            {"score": last_score, "id": {"$lt": last_id}}
+        ]}})
+    page += [{"$sort": {"score": -1, "id": -1}}, {"$limit": limit + 1}]
+    
+    stages: Dict[str, List[Dict[str, Any]]] = {"results": page}
+    if not cursor:
+        stages["total"] = [{"$count": "count"}]
+        for field in facets:
+            stages[field] = [
+                {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1}},
+                {"$limit": SEARCH_FACET_LIMIT}
+            ]
+    
+    result = (await collection.aggregate([
+        {"$match": {"$text": {"$search": q}, **filters}},
+        {"$project": {"_id": 0}},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+        {"$facet": stages},
+    ]).to_list(1))[0]
+    
+    docs = result["results"]
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1]["score"], docs[-1]["id"])
+    if cursor:
+        return docs, next_cursor, None, None
+    total = result["total"][0]["count"] if result["total"] else 0
+    facet_counts = {field: {str(row["_id"]): row["count"] for row in result[field]} for field in facets}
+    return docs, next_cursor, total, facet_counts
+
+# ============ Resumable Uploads ============
+
+def session_expiry() -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=RESUMABLE_SESSION_TTL)).isoformat()
+
+async def get_upload_session(upload_id: str) -> UploadSession:
+    doc = await db.upload_sessions.find_one({"id": upload_id}, {"_id": 0})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return UploadSession(**doc)
+
+def part_range(session: UploadSession, part: int):
+    """(first GridFS chunk number, chunk count, byte length) of one part"""
+    chunks_per_part = session.part_size // UPLOAD_CHUNK_SIZE
+    length = min(session.part_size, session.size - part * session.part_size)
+    return part * chunks_per_part, chunks_per_part, length
+
+async def write_part(session: UploadSession, part: int, body, expected_sha256: str) -> int:
+    """Stream one part's bytes into fs.chunks under the session's file id, returns its size"""
+    files_id = ObjectId(session.storage_id)
+    first_n, chunk_count, expected = part_range(session, part)
+    chunks = db["fs.chunks"]
+    part_chunks = {"files_id": files_id, "n": {"$gte": first_n, "$lt": first_n + chunk_count}}
+    # A retried part replaces whatever the earlier attempt wrote
+    await chunks.delete_many(part_chunks)
+    
+    hasher = hashlib.sha256()
+    buffer = bytearray()
+    size = 0
+    n = first_n
+    try:
+        async for data in body:
+            size += len(data)
+            if size > expected:
+                raise HTTPException(status_code=413, detail=f"Part {part} must be {expected} bytes")
+            hasher.update(data)
+            buffer += data
+            while len(buffer) >= UPLOAD_CHUNK_SIZE:
+                await chunks.insert_one({"files_id": files_id, "n": n, "data": bytes(buffer[:UPLOAD_CHUNK_SIZE])})
+                del buffer[:UPLOAD_CHUNK_SIZE]
+                n += 1
+            UPLOAD_BYTES.inc(len(data))
+        if size != expected:
+            raise HTTPException(status_code=400, detail=f"Part {part} must be {expected} bytes, got {size}")
+        if hasher.hexdigest() != expected_sha256:
+            raise HTTPException(status_code=422, detail=f"Part {part} checksum mismatch, re-send it")
+        if buffer:
+            await chunks.insert_one({"files_id": files_id, "n": n, "data": bytes(buffer)})
+    except BaseException:
+        await chunks.delete_many(part_chunks)
+        raise
+    return size
+
+async def assemble_upload(session: UploadSession) -> str:
+    """Verify the written chunks as one file and publish it to GridFS, returns its sha256"""
+    files_id = ObjectId(session.storage_id)
+    hasher = hashlib.sha256()
+    size = 0
+    expected_n = 0
+    async for chunk in db["fs.chunks"].find({"files_id": files_id}, {"n": 1, "data": 1}).sort("n", 1):
+        if chunk["n"] != expected_n:
+            raise HTTPException(status_code=409, detail=f"Chunk {expected_n} is missing, re-send its part")
+        hasher.update(chunk["data"])
+        size += len(chunk["data"])
+        expected_n += 1
+    if size != session.size:
+        raise HTTPException(status_code=409, detail=f"Stored {size} of {session.size} bytes, re-send missing parts")
+    sha256 = hasher.hexdigest()
+    if session.sha256 and sha256 != session.sha256:
+        raise HTTPException(status_code=422, detail="File checksum does not match the one declared at initiation")
+    
+    # The files document is what makes the chunks a readable GridFS file; a retried completion rewrites it
+    await db["fs.files"].replace_one({"_id": files_id}, {
+        "length": size,
+        "chunkSize": UPLOAD_CHUNK_SIZE,
+        "uploadDate": datetime.now(timezone.utc),
+        "filename": session.filename,
+        "metadata": {"content_type": session.content_type},
+    }, upsert=True)
+    return sha256
+
+async def finish_upload(session: UploadSession):
+    """Publish, reference and record a claimed session; every step is safe to repeat after a failure"""
+    if not session.blob_id:
+        sha256 = await assemble_upload(session)
+        blob_id = await register_blob(session.storage_id, sha256, session.size, session.content_type, private=True)
+        # Recorded at once: register_blob may have dropped our chunks for an identical stored copy
+        await db.upload_sessions.update_one(
+            {"id": session.id},
+            {"$set": {"sha256": sha256, "blob_id": blob_id}}
+        )
+        session.sha256, session.blob_id = sha256, blob_id
+    file_obj = FileUpload(
+        id=session.file_id,
+        filename=session.filename,
+        storage_id=session.blob_id,
+        sha256=session.sha256,
+        content_type=session.content_type,
+        size=session.size
+    )
+    await db.file_uploads.update_one({"id": file_obj.id}, {"$setOnInsert": file_obj.model_dump()}, upsert=True)
+    await db.upload_sessions.update_one(
+        {"id": session.id},
+        {"$set": {"status": "complete", "expires_at": session_expiry()}}
+    )
+
+async def collect_upload_sessions():
+    """Periodically remove expired sessions, and the chunks of any that never completed"""
+    while True:
+        await asyncio.sleep(RESUMABLE_GC_INTERVAL)
+        now = datetime.now(timezone.utc).isoformat()
+        try:
+            while True:
+                session = await db.upload_sessions.find_one_and_delete({"expires_at": {"$lt": now}})
+                if session is None:
+                    break
+                if session["status"] == "complete":
+                    continue
+                if session.get("blob_id"):
+                    # Completion got as far as referencing the blob; give the reference back
+                    if not await db.file_uploads.find_one({"id": session.get("file_id")}, {"_id": 1}):
+                        await release_stored_files([{"sha256": session["sha256"]}])
+                elif not await db.blobs.find_one({"storage_id": session["storage_id"]}, {"_id": 1}):
+                    # Unless a blob took these bytes before the session could record it, they are ours alone
+                    await delete_stored_files([session["storage_id"]])
+                logger.info(f"Removed abandoned upload session {session['id']}")
+        except PyMongoError as e:
+            logger.warning(f"Upload session GC pass failed: {e}")
+
+# ============ Retention & Archival ============
+
+class LocalArchiveStore:
+    """Archive files in a local directory, written to a temporary name and renamed when complete"""
+    
+    def __init__(self, directory: Path):
+        self.directory = directory
+    
+    def _write(self, name: str, data: bytes):
+        path = self.directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".partial")
+        with open(partial, "wb") as out:
+            out.write(data)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(partial, path)
+    
+    async def put(self, name: str, data: bytes):
+        await asyncio.to_thread(self._write, name, data)
+
+class GridFSArchiveStore:
+    """Archive files in their own GridFS bucket, for deployments without a persistent disk"""
+    
+    @functools.cached_property
+    def bucket(self) -> AsyncIOMotorGridFSBucket:
+        # Built on first use, inside the serving loop, like get_fs_bucket()
+        return AsyncIOMotorGridFSBucket(db, bucket_name="archives")
+    
+    async def put(self, name: str, data: bytes):
+        await self.bucket.upload_from_stream(name, data, metadata={"content_type": "application/gzip"})
+
+ARCHIVE_STORES = {"local": lambda: LocalArchiveStore(ARCHIVE_DIR), "gridfs": GridFSArchiveStore, "none": lambda: None}
+archive_store = ARCHIVE_STORES[ARCHIVE_STORE]()
+
+def encode_archive(docs: List[Dict[str, Any]]) -> bytes:
+    """Gzipped NDJSON, one record per line"""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31)  # gzip container
+    body = "".join(json.dumps(doc, default=str) + "\n" for doc in docs).encode()
+    return compressor.compress(body) + compressor.flush()
+
+async def unreferenced_uploads(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop uploads a driver photo or advertiser creative still points at"""
+    ids = [doc["id"] for doc in docs]
+    used = set(await db.driver_applications.distinct("photo_id", {"photo_id": {"$in": ids}}))
+    used.update(await db.advertiser_submissions.distinct("creative_id", {"creative_id": {"$in": ids}}))
+    return [doc for doc in docs if doc["id"] not in used]
+
+# collection -> (timestamp field, retention days, extra filter, narrows a batch to what may go)
+RETENTION_POLICIES: Dict[str, tuple] = {
+    "email_logs": (
+        "timestamp",
+        EMAIL_LOG_RETENTION_DAYS,
+        # Finished deliveries, plus logs from before the outbox that will never be sent.
+        # Without SMTP_HOST nothing is ever delivered, so every log just ages out
+        {"$or": [{"status": {"$in": ["sent", "failed"]}}, {"next_attempt_at": {"$exists": False}}]} if SMTP_HOST else {},
+        None
+    ),
+    "file_uploads": ("uploaded_at", UPLOAD_RETENTION_DAYS, {}, unreferenced_uploads),
+}
+
+async def apply_retention(collection_name: str) -> Dict[str, int]:
+    """Archive, then delete, a collection's expired records in batches.
+
+    A batch is only deleted after its archive file is stored, so a crash
+    archives some records twice rather than losing them.
+    """
+    field, days, extra, narrow = RETENTION_POLICIES[collection_name]
+    counts = {"archived": 0, "deleted": 0}
+    if days <= 0:
+        return counts
+    collection = db[collection_name]
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    last = None
+    part = 0
+    while True:
+        query = {"$and": [extra, {field: {"$lt": cutoff}}]}
+        if last:
+            # Keyset past the previous batch, which may have left kept records behind
+            query["$and"].append({"$or": [{field: {"$gt": last[0]}}, {field: last[0], "id": {"$gt": last[1]}}]})
+        docs = await collection.find(query, {"_id": 0}).sort(
+            [(field, 1), ("id", 1)]
+        ).limit(RETENTION_BATCH_SIZE).to_list(None)
+        if not docs:
+            return counts
+        last = (docs[-1][field], docs[-1]["id"])
+        expired = await narrow(docs) if narrow else docs
+        if not expired:
+            continue
+        
+        if archive_store is not None:
+            part += 1
+            data = await cpu_executor.run(encode_archive, expired)
+            await archive_store.put(f"{collection_name}/{run_id}-{part:05d}.ndjson.gz", data)
+            counts["archived"] += len(expired)
+        result = await collection.delete_many({"id": {"$in": [doc["id"] for doc in expired]}})
+        counts["deleted"] += result.deleted_count
+        if collection_name == "file_uploads":
+            await release_stored_files(expired)
+
+async def run_retention():
+    """Apply every retention policy once per RETENTION_INTERVAL"""
+    while True:
+        for collection_name in RETENTION_POLICIES:
+            try:
+                counts = await apply_retention(collection_name)
+                if counts["deleted"]:
+                    logger.info(f"Retention on {collection_name}: {counts}")
+            except (PyMongoError, OSError) as e:
+                logger.warning(f"Retention on {collection_name} failed: {e}")
+        await asyncio.sleep(RETENTION_INTERVAL)
+
 # ============ Routes ============
 
 @api_router.get("/")
@@ -315,6 +2309,7 @@ async def initialize_cms():
     ]
     
     await db.content_blocks.insert_many(default_blocks)
+    cms_page_cache.invalidate(*{block["page"] for block in default_blocks})
     
     return {
         "success": True,
@@ -322,15 +2317,33 @@ async def initialize_cms():
         "blocks_created": len(default_blocks)
     }
 
+@api_router.post("/admin/migrate-media")
+async def migrate_media_to_gridfs():
+    """Move legacy base64 media and uploads into GridFS - run once"""
+    migrated = {"media_files": 0, "file_uploads": 0}
+    
+    for collection, field in (("media_files", "data"), ("file_uploads", "content")):
+        cursor = db[collection].find({field: {"$exists": True}}, {"_id": 0}, batch_size=10)
+        async for doc in cursor:
+            content_type = doc.get("content_type") or "application/octet-stream"
+            storage_id, size, sha256 = await store_base64(
+                doc.get("filename") or doc["id"], content_type, doc[field], private=collection == "file_uploads"
+            )
+            await db[collection].update_one(
+                {"id": doc["id"]},
+                {"$set": {"storage_id": storage_id, "sha256": sha256, "size": size}, "$unset": {field: ""}}
+            )
+            migrated[collection] += 1
+    
+    logger.info(f"Migrated base64 files to GridFS: {migrated}")
+    return {"success": True, "migrated": migrated}
+
 # Driver Application Routes
-@api_router.post("/drivers/apply", response_model=DriverApplication)
+@api_router.post("/drivers/apply", response_model=DriverApplication, dependencies=[Depends(rate_limit("submit"))])
 async def submit_driver_application(application: DriverApplicationCreate):
     app_dict = application.model_dump()
     app_obj = DriverApplication(**app_dict)
     
-    doc = app_obj.model_dump()
-    await db.driver_applications.insert_one(doc)
-    
     # Log email notification
     email_body = f"""
 New Driver Application Received
@@ -346,31 +2359,48 @@ Application ID: {app_obj.id}
 Submitted: {app_obj.submitted_at}
     """
     
-    await log_email(
+    email_log = new_email_log(
         log_type="driver_application",
         recipient="nurettinerzen@gmail.com",
         subject=f"New Driver Application - {application.name}",
         body=email_body,
         form_data=app_dict
     )
+    await save_submission("driver_applications", app_obj.model_dump(), email_log)
     
     logger.info(f"New driver application from {application.email} in {application.city}")
     return app_obj
 
 @api_router.get("/drivers/applications", response_model=List[DriverApplication])
-async def get_driver_applications():
-    apps = await db.driver_applications.find({}, {"_id": 0}).to_list(1000)
-    return apps
+async def get_driver_applications(
+    response: Response,
+    query: Dict[str, Any] = Depends(driver_filters),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    apps, next_cursor = await paginate(db.driver_applications, query, "submitted_at", limit, cursor, fields)
+    return page_response(apps, next_cursor, fields, response)
+
+@api_router.get("/drivers/applications/export")
+async def export_driver_applications(
+    query: Dict[str, Any] = Depends(driver_filters),
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    gzip: bool = False
+):
+    """Stream driver applications as CSV or NDJSON"""
+    return export_response(db.driver_applications, query, DriverApplication, "driver_applications", fmt, gzip)
 
 # Advertiser Submission Routes
-@api_router.post("/advertisers/contact", response_model=AdvertiserSubmission)
+@api_router.post(
+    "/advertisers/contact",
+    response_model=AdvertiserSubmission,
+    dependencies=[Depends(rate_limit("submit"))]
+)
 async def submit_advertiser_contact(submission: AdvertiserSubmissionCreate):
     sub_dict = submission.model_dump()
     sub_obj = AdvertiserSubmission(**sub_dict)
     
-    doc = sub_obj.model_dump()
-    await db.advertiser_submissions.insert_one(doc)
-    
     # Log email notification
     email_body = f"""
 New Advertiser Inquiry Received
@@ -386,33 +2416,51 @@ Inquiry ID: {sub_obj.id}
 Submitted: {sub_obj.submitted_at}
     """
     
-    await log_email(
+    email_log = new_email_log(
         log_type="advertiser_inquiry",
         recipient="nurettinerzen@gmail.com",
         subject=f"New Advertiser Inquiry - {submission.company_name}",
         body=email_body,
         form_data=sub_dict
     )
+    await save_submission("advertiser_submissions", sub_obj.model_dump(), email_log)
     
     logger.info(f"New advertiser inquiry from {submission.company_name} - {submission.email}")
     return sub_obj
 
 @api_router.get("/advertisers/submissions", response_model=List[AdvertiserSubmission])
-async def get_advertiser_submissions():
-    subs = await db.advertiser_submissions.find({}, {"_id": 0}).to_list(1000)
-    return subs
+async def get_advertiser_submissions(
+    response: Response,
+    query: Dict[str, Any] = Depends(advertiser_filters),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    subs, next_cursor = await paginate(db.advertiser_submissions, query, "submitted_at", limit, cursor, fields)
+    return page_response(subs, next_cursor, fields, response)
+
+@api_router.get("/advertisers/submissions/export")
+async def export_advertiser_submissions(
+    query: Dict[str, Any] = Depends(advertiser_filters),
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    gzip: bool = False
+):
+    """Stream advertiser inquiries as CSV or NDJSON"""
+    return export_response(db.advertiser_submissions, query, AdvertiserSubmission, "advertiser_submissions", fmt, gzip)
 
 # File Upload Routes
-@api_router.post("/upload")
+@api_router.post("/upload", dependencies=[Depends(rate_limit("upload"))])
 async def upload_file(file: UploadFile = File(...)):
     try:
-        contents = await file.read()
-        base64_content = base64.b64encode(contents).decode('utf-8')
+        content_type = file.content_type or "application/octet-stream"
+        storage_id, size, sha256 = await store_upload(file, content_type, private=True)
         
         file_obj = FileUpload(
             filename=file.filename,
-            content=base64_content,
-            content_type=file.content_type
+            storage_id=storage_id,
+            sha256=sha256,
+            content_type=content_type,
+            size=size
         )
         
         doc = file_obj.model_dump()
@@ -423,6 +2471,116 @@ async def upload_file(file: UploadFile = File(...)):
         logger.error(f"File upload error: {str(e)}")
         raise HTTPException(status_code=500, detail="File upload failed")
 
+@api_router.post("/uploads", status_code=201, dependencies=[Depends(rate_limit("upload"))])
+async def initiate_upload(request: UploadSessionCreate):
+    """Start a resumable upload; the client then PUTs numbered parts, in any order or in parallel"""
+    session = UploadSession(**request.model_dump(), expires_at=session_expiry())
+    await db.upload_sessions.insert_one(session.model_dump())
+    return {
+        "upload_id": session.id,
+        "part_size": session.part_size,
+        "part_count": session.part_count,
+        "expires_at": session.expires_at
+    }
+
+@api_router.put("/uploads/{upload_id}/parts/{part}")
+async def upload_part(
+    upload_id: str,
+    part: int,
+    request: Request,
+    part_sha256: str = Header(..., alias="X-Part-SHA256", pattern="^[0-9a-f]{64}$")
+):
+    """Store one part from the raw request body, verified against its SHA-256"""
+    session = await get_upload_session(upload_id)
+    if session.status != "open" or session.blob_id:
+        # Once the blob is referenced its chunks may be shared, so they can't change
+        raise HTTPException(status_code=409, detail="Upload is already complete")
+    if not 0 <= part < session.part_count:
+        raise HTTPException(status_code=400, detail=f"Part must be between 0 and {session.part_count - 1}")
+    
+    size = await write_part(session, part, request.stream(), part_sha256)
+    await db.upload_sessions.update_one(
+        {"id": upload_id, "status": "open", "blob_id": None},
+        {"$set": {f"parts.{part}": {"size": size, "sha256": part_sha256}, "expires_at": session_expiry()}}
+    )
+    return {"part": part, "size": size, "sha256": part_sha256}
+
+@api_router.get("/uploads/{upload_id}")
+async def get_upload_status(upload_id: str):
+    """Parts received so far and the contiguous offset a sequential client can resume from"""
+    session = await get_upload_session(upload_id)
+    received = sorted(int(part) for part in session.parts)
+    offset = 0
+    for part in range(session.part_count):
+        if str(part) not in session.parts:
+            break
+        offset += session.parts[str(part)]["size"]
+    return {
+        "upload_id": session.id,
+        "status": session.status,
+        "size": session.size,
+        "part_size": session.part_size,
+        "part_count": session.part_count,
+        "received_parts": received,
+        "missing_parts": [part for part in range(session.part_count) if str(part) not in session.parts],
+        "offset": offset,
+        "file_id": session.file_id,
+        "expires_at": session.expires_at
+    }
+
+@api_router.post("/uploads/{upload_id}/complete")
+async def complete_upload(upload_id: str, request: Optional[UploadCompleteRequest] = None):
+    """Assemble the parts into a stored file, optionally attaching it to an advertiser submission"""
+    session = await get_upload_session(upload_id)
+    submission_id = request.submission_id if request else None
+    if submission_id and not await db.advertiser_submissions.find_one({"id": submission_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Submission not found")
+    
+    if session.status != "complete":
+        missing = [part for part in range(session.part_count) if str(part) not in session.parts]
+        if missing:
+            raise HTTPException(status_code=409, detail=f"Missing parts: {missing[:20]}")
+        # Only one concurrent complete call does the work; a stalled one is taken over once its lease runs out
+        now = datetime.now(timezone.utc)
+        claim = {
+            "status": "completing",
+            "lease_until": (now + timedelta(seconds=RESUMABLE_COMPLETE_LEASE)).isoformat(),
+            "file_id": session.file_id or str(uuid.uuid4()),
+            "expires_at": session_expiry()
+        }
+        claimed = await db.upload_sessions.find_one_and_update(
+            {"id": upload_id, "$or": [
+                {"status": "open"},
+                {"status": "completing", "lease_until": {"$lt": now.isoformat()}}
+            ]},
+            {"$set": claim},
+            projection={"_id": 0}
+        )
+        if not claimed:
+            raise HTTPException(status_code=409, detail="Upload is already being completed")
+        session = UploadSession(**{**claimed, **claim})
+        try:
+            await finish_upload(session)
+        except BaseException:
+            await db.upload_sessions.update_one(
+                {"id": upload_id, "status": "completing"},
+                {"$set": {"status": "open", "lease_until": ""}}
+            )
+            raise
+    
+    if submission_id:
+        await db.advertiser_submissions.update_one({"id": submission_id}, {"$set": {"creative_id": session.file_id}})
+    return {"success": True, "file_id": session.file_id, "filename": session.filename}
+
+@api_router.delete("/uploads/{upload_id}")
+async def abort_upload(upload_id: str):
+    """Abandon an unfinished upload and free its chunks right away"""
+    session = await db.upload_sessions.find_one_and_delete({"id": upload_id, "status": "open", "blob_id": None})
+    if not session:
+        raise HTTPException(status_code=404, detail="Open upload session not found")
+    await db["fs.chunks"].delete_many({"files_id": ObjectId(session["storage_id"])})
+    return {"success": True, "message": "Upload aborted"}
+
 @api_router.get("/upload/{file_id}")
 async def get_file(file_id: str):
     file_doc = await db.file_uploads.find_one({"id": file_id}, {"_id": 0})
@@ -430,21 +2588,60 @@ async def get_file(file_id: str):
         raise HTTPException(status_code=404, detail="File not found")
     return file_doc
 
+@api_router.get("/upload/{file_id}/raw")
+async def get_file_raw(file_id: str, request: Request):
+    """Stream the raw bytes of an uploaded file"""
+    file_doc = await db.file_uploads.find_one({"id": file_id}, {"_id": 0})
+    if not file_doc or not file_doc.get("storage_id"):
+        raise HTTPException(status_code=404, detail="File not found")
+    return await stored_file_response(request, file_doc, public=False)
+
 # CMS Routes
 @api_router.get("/cms/blocks", response_model=List[ContentBlock])
-async def get_all_content_blocks():
-    """Get all content blocks"""
-    blocks = await db.content_blocks.find({}, {"_id": 0}).to_list(1000)
-    return blocks
+async def get_all_content_blocks(
+    response: Response,
+    page: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE_MAX, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Get content blocks: all of them in creation order, or one page's most recently edited first"""
+    if page:
+        blocks, next_cursor = await paginate(db.content_blocks, {"page": page}, "updated_at", limit, cursor, fields)
+    else:
+        # The CMS editor lists everything; saving a block must not reorder it
+        blocks, next_cursor = await paginate_created(db.content_blocks, {}, limit, cursor, fields)
+    return page_response(blocks, next_cursor, fields, response)
 
-@api_router.get("/cms/blocks/{page}", response_model=List[ContentBlock])
+@api_router.get(
+    "/cms/blocks/{page}",
+    response_model=List[ContentBlock],
+    dependencies=[Depends(rate_limit("cms_read"))]
+)
 async def get_page_content_blocks(page: str):
-    """Get content blocks for a specific page"""
-    blocks = await db.content_blocks.find(
-        {"page": page, "is_active": True}, 
-        {"_id": 0}
-    ).sort("order", 1).to_list(1000)
-    return blocks
+    """Get content blocks for a specific page, served from the page cache when warm"""
+    body = cms_page_cache.get(page)
+    if body is not None:
+        CMS_CACHE_HITS.inc()
+    else:
+        CMS_CACHE_MISSES.inc()
+        body = await single_flight.do(f"page:{page}", load_page, page)
+    return Response(content=body, media_type="application/json")
+
+@api_router.get("/cms/snapshot", dependencies=[Depends(rate_limit("cms_read"))])
+async def get_cms_snapshot(request: Request):
+    """Every active block grouped by page in one versioned, precompressed document"""
+    version, encodings = await cms_snapshot.get()
+    # Weak, because the same version is served under several content encodings
+    headers = {"ETag": f'W/"{version}"', "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, f'"{version}"'):
+        return Response(status_code=304, headers=headers)
+    
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), encodings)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=encodings[encoding], media_type="application/json", headers=headers)
 
 @api_router.put("/cms/blocks/{block_id}")
 async def update_content_block(block_id: str, update: ContentBlockUpdate):
@@ -463,6 +2660,10 @@ async def update_content_block(block_id: str, update: ContentBlockUpdate):
     
     # Return updated block
     block = await db.content_blocks.find_one({"id": block_id}, {"_id": 0})
+    if block:
+        cms_page_cache.invalidate(block["page"])
+    else:
+        cms_page_cache.clear()
     return block
 
 @api_router.post("/cms/blocks")
@@ -470,24 +2671,28 @@ async def create_content_block(block: ContentBlock):
     """Create a new content block"""
     doc = block.model_dump()
     await db.content_blocks.insert_one(doc)
+    cms_page_cache.invalidate(block.page)
     return block
 
 @api_router.post("/cms/media", response_model=MediaFile)
-async def upload_media(file: UploadFile = File(...)):
-    """Upload media file"""
+async def upload_media(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    """Upload media file; image variants are rendered after the response"""
     try:
-        contents = await file.read()
-        base64_data = base64.b64encode(contents).decode('utf-8')
+        content_type = file.content_type or "application/octet-stream"
+        storage_id, size, sha256 = await store_upload(file, content_type)
         
         media_file = MediaFile(
             filename=file.filename,
-            data=base64_data,
-            content_type=file.content_type,
-            size=len(contents)
+            storage_id=storage_id,
+            sha256=sha256,
+            content_type=content_type,
+            size=size
         )
         
         doc = media_file.model_dump()
         await db.media_files.insert_one(doc)
+        if content_type in VARIANT_SOURCE_TYPES:
+            background_tasks.add_task(build_all_variants, media_file.model_dump())
         
         return media_file
     except Exception as e:
@@ -497,43 +2702,239 @@ async def upload_media(file: UploadFile = File(...)):
 @api_router.get("/cms/media", response_model=List[MediaFile])
 async def get_all_media():
     """Get all media files"""
-    # Don't include the actual base64 data in list view for performance
+    # Unmigrated legacy rows still carry their base64 payload in `data`
     media = await db.media_files.find(
         {}, 
         {"_id": 0, "data": 0}
     ).sort("uploaded_at", -1).to_list(1000)
-    return media
+    return trusted_response(media)
 
 @api_router.get("/cms/media/{media_id}", response_model=MediaFile)
 async def get_media_file(media_id: str):
-    """Get a specific media file with full data"""
-    media = await db.media_files.find_one({"id": media_id}, {"_id": 0})
+    """Get a specific media file's metadata"""
+    media = await db.media_files.find_one({"id": media_id}, {"_id": 0, "data": 0})
     if not media:
         raise HTTPException(status_code=404, detail="Media file not found")
-    return media
+    return trusted_response(media)
+
+@api_router.get("/cms/media/{media_id}/raw")
+async def get_media_file_raw(
+    media_id: str,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1),
+    fmt: Optional[str] = Query(None, alias="format")
+):
+    """Stream the raw bytes of a media file, or of a resized/re-encoded variant"""
+    media = await db.media_files.find_one({"id": media_id}, {"_id": 0})
+    if not media or not media.get("storage_id"):
+        raise HTTPException(status_code=404, detail="Media file not found")
+    if w is None and fmt is None:
+        return await stored_file_response(request, media)
+    
+    if media["content_type"] not in VARIANT_SOURCE_TYPES:
+        raise HTTPException(status_code=400, detail="Variants are only available for images")
+    fmt = fmt or (MEDIA_VARIANT_FORMATS[0] if MEDIA_VARIANT_FORMATS else None)
+    if fmt not in MEDIA_VARIANT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Supported formats: {', '.join(MEDIA_VARIANT_FORMATS)}")
+    if w is not None:
+        # Snap to a configured width so arbitrary widths can't fill storage
+        w = next((width for width in MEDIA_VARIANT_WIDTHS if width >= w), MEDIA_VARIANT_WIDTHS[-1])
+    
+    try:
+        storage_id = await get_variant(media, w, fmt)
+    except gridfs.errors.NoFile:
+        raise HTTPException(status_code=404, detail="Stored file not found")
+    except (OSError, Image.DecompressionBombError) as e:
+        logger.error(f"Variant render failed for media {media_id}: {e}")
+        raise HTTPException(status_code=422, detail="Media file is not a decodable image")
+    variant = {"storage_id": storage_id, "content_type": f"image/{fmt}", "uploaded_at": media["uploaded_at"]}
+    return await stored_file_response(request, variant)
 
 @api_router.delete("/cms/media/{media_id}")
 async def delete_media_file(media_id: str):
     """Delete a media file"""
-    result = await db.media_files.delete_one({"id": media_id})
-    if result.deleted_count == 0:
+    # Files claimed by a running bulk delete belong to it
+    media = await db.media_files.find_one_and_delete(
+        {"id": media_id, "deleting": {"$exists": False}},
+        {"_id": 0}
+    )
+    if not media:
         raise HTTPException(status_code=404, detail="Media file not found")
+    await release_stored_files([media])
+    await delete_stored_files(list((media.get("variants") or {}).values()))
     return {"success": True, "message": "Media file deleted"}
 
+@api_router.post("/cms/media/bulk-delete")
+async def bulk_delete_media_files(request: BulkMediaDeleteRequest):
+    """Delete media files by id list or filter, releasing their storage in one batch"""
+    bulk_target(request.ids, request.filter)
+    if request.ids is not None:
+        query = {"id": {"$in": request.ids}}
+    else:
+        query = media_filter_query(request.filter)
+    
+    # Claim first, so a concurrent single delete can't release the same file twice
+    token = str(uuid.uuid4())
+    await db.media_files.update_many(
+        {**query, "deleting": {"$exists": False}},
+        {"$set": {"deleting": token}}
+    )
+    claimed = await db.media_files.find({"deleting": token}, {"_id": 0}).to_list(None)
+    await db.media_files.delete_many({"deleting": token})
+    
+    await release_stored_files(claimed)
+    await delete_stored_files([
+        storage_id for media in claimed for storage_id in (media.get("variants") or {}).values()
+    ])
+    
+    deleted = {media["id"] for media in claimed}
+    ids = request.ids if request.ids is not None else sorted(deleted)
+    return {
+        "deleted": len(deleted),
+        "results": [{"id": media_id, "result": "deleted" if media_id in deleted else "not_found"} for media_id in ids]
+    }
+
+@api_router.get("/blobs/{sha256}")
+async def get_blob(sha256: str, request: Request):
+    """Stream stored bytes by content hash; the URL never changes meaning, so CMS media caches forever"""
+    blob = await db.blobs.find_one({"_id": sha256, "ref_count": {"$gt": 0}})
+    if not blob:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    doc = {
+        "storage_id": blob["storage_id"],
+        "sha256": sha256,
+        "content_type": blob["content_type"],
+        "uploaded_at": blob["created_at"]
+    }
+    # Bytes a driver or advertiser uploaded must stay out of shared caches, like /upload/{id}/raw
+    return await stored_file_response(request, doc, public=not blob.get("private"))
+
+@api_router.post("/admin/blobs/mark-private")
+async def mark_private_blobs():
+    """Flag blobs that uploads registered before the private flag existed - run once"""
+    hashes = await db.file_uploads.distinct("sha256", {"sha256": {"$ne": None}})
+    result = await db.blobs.update_many({"_id": {"$in": hashes}, "private": {"$ne": True}}, {"$set": {"private": True}})
+    return {"success": True, "marked": result.modified_count}
+
 # Email Logs Routes
 @api_router.get("/admin/email-logs", response_model=List[EmailLog])
-async def get_email_logs():
-    """Get all email logs"""
-    logs = await db.email_logs.find({}, {"_id": 0}).sort("timestamp", -1).to_list(1000)
-    return logs
+async def get_email_logs(
+    response: Response,
+    query: Dict[str, Any] = Depends(email_log_filters),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Get email logs, newest first"""
+    logs, next_cursor = await paginate(db.email_logs, query, "timestamp", limit, cursor, fields)
+    return page_response(logs, next_cursor, fields, response)
+
+@api_router.get("/admin/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    scope: str = Query("drivers", pattern="^(drivers|advertisers|email_logs)$"),
+    status: Optional[str] = None,
+    city: Optional[str] = None,
+    platform: Optional[str] = None,
+    budget_range: Optional[str] = None,
+    log_type: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None
+):
+    """Ranked full-text search with facet counts over applications, inquiries or email logs"""
+    collection_name, facets = SEARCH_SCOPES[scope]
+    requested = {"status": status, "city": city, "platform": platform, "budget_range": budget_range, "log_type": log_type}
+    filters = {field: value for field, value in requested.items() if value}
+    unsupported = set(filters) - set(facets)
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Cannot filter {scope} by {', '.join(sorted(unsupported))}")
+    
+    docs, next_cursor, total, facet_counts = await search_collection(
+        db[collection_name], q, filters, facets, limit, cursor
+    )
+    # Later pages skip the counts; clients keep the ones from the first page
+    return ORJSONResponse(
+        {"results": docs, "total": total, "facets": facet_counts},
+        headers={"X-Next-Cursor": next_cursor} if next_cursor else {}
+    )
+
+@api_router.post("/admin/retention/run")
+async def run_retention_now():
+    """Apply the retention policies immediately instead of waiting for the sweeper"""
+    return {name: await apply_retention(name) for name in RETENTION_POLICIES}
+
+@api_router.get("/admin/storage")
+async def get_storage_footprint():
+    """Documents, data, storage and index bytes per collection, largest first"""
+    report = []
+    for name in await db.list_collection_names():
+        stats = await db[name].aggregate([{"$collStats": {"storageStats": {}}}]).to_list(1)
+        storage = stats[0]["storageStats"] if stats else {}
+        report.append({
+            "collection": name,
+            "count": storage.get("count", 0),
+            "size": storage.get("size", 0),
+            "avg_obj_size": storage.get("avgObjSize", 0),
+            "storage_size": storage.get("storageSize", 0),
+            "total_index_size": storage.get("totalIndexSize", 0),
+            "retention_days": RETENTION_POLICIES[name][1] if name in RETENTION_POLICIES else None,
+        })
+    report.sort(key=lambda row: row["storage_size"] + row["total_index_size"], reverse=True)
+    return report
+
+@api_router.get("/admin/indexes")
+async def get_index_report():
+    """Report missing, unused and unmanaged indexes plus the plans of hot queries"""
+    report = {}
+    for collection, indexes in INDEXES.items():
+        expected = {index.document["name"] for index in indexes}
+        existing = await db[collection].index_information()
+        usage = {
+            stat["name"]: stat["accesses"]["ops"]
+            async for stat in db[collection].aggregate([{"$indexStats": {}}])
+        }
+        
+        probes = []
+        for query, sort in INDEX_PROBES.get(collection, []):
+            cursor = db[collection].find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            plan = (await cursor.explain())["queryPlanner"]["winningPlan"]
+            stages = plan_stages(plan)
+            probes.append({
+                "filter": list(query),
+                "sort": [field for field, _ in sort or []],
+                "stages": stages,
+                "collection_scan": "COLLSCAN" in stages,
+            })
+        
+        report[collection] = {
+            "missing": sorted(expected - set(existing)),
+            "unused": sorted(name for name, ops in usage.items() if ops == 0 and name != "_id_"),
+            "unmanaged": sorted(set(existing) - expected - {"_id_"}),
+            "usage": usage,
+            "probes": probes,
+        }
+    return report
+
+@api_router.get("/admin/executors")
+async def get_executor_stats():
+    """Concurrency and queue depth of the CPU offload executors"""
+    return {executor.name: executor.stats() for executor in executors}
 
 # Admin Routes
 @api_router.post("/admin/login", response_model=AdminLoginResponse)
 async def admin_login(credentials: AdminLogin):
     # Simple password check (for MVP - can enhance with JWT later)
-    admin_password = os.environ.get('ADMIN_PASSWORD', 'admin123')
+    admin_password_hash = os.environ.get('ADMIN_PASSWORD_HASH')
+    if admin_password_hash:
+        # bcrypt is deliberately slow, so verify off the event loop
+        password_ok = await cpu_executor.run(verify_password, credentials.password, admin_password_hash)
+    else:
+        admin_password = os.environ.get('ADMIN_PASSWORD', 'admin123')
+        password_ok = secrets.compare_digest(credentials.password.encode(), admin_password.encode())
     
-    if credentials.username == "admin" and credentials.password == admin_password:
+    if credentials.username == "admin" and password_ok:
         # Generate a simple token (UUID for now)
         token = str(uuid.uuid4())
         return AdminLoginResponse(
@@ -547,6 +2948,39 @@ async def admin_login(credentials: AdminLogin):
             message="Invalid credentials"
         )
 
+@api_router.get("/admin/stats")
+async def get_admin_stats():
+    """Dashboard counts by status, city and platform, daily submissions and conversion rates"""
+    body = admin_stats_cache.get("stats")
+    if body is None:
+        version = admin_stats_cache.version("stats")
+        since = (datetime.now(timezone.utc) - timedelta(days=ADMIN_STATS_DAYS)).date().isoformat()
+        drivers, advertisers = await asyncio.gather(
+            submission_stats(
+                db.driver_applications,
+                {"by_status": "status", "by_city": "city", "by_platform": "platform"},
+                since
+            ),
+            submission_stats(
+                db.advertiser_submissions,
+                {"by_status": "status", "by_budget_range": "budget_range"},
+                since
+            )
+        )
+        body = json.dumps({
+            "drivers": drivers,
+            "advertisers": advertisers,
+            "since": since,
+            "generated_at": datetime.now(timezone.utc).isoformat()
+        }).encode()
+        admin_stats_cache.set("stats", body, version)
+    return Response(content=body, media_type="application/json")
+
+@api_router.put("/admin/drivers/bulk-status")
+async def bulk_update_driver_status(request: BulkStatusUpdateRequest):
+    """Set the status of many applications, by id list or filter, in one write"""
+    return await bulk_update_status(db.driver_applications, request, driver_filters)
+
 @api_router.put("/admin/drivers/{application_id}/status")
 async def update_driver_status(application_id: str, update: UpdateStatusRequest):
     result = await db.driver_applications.update_one(
@@ -557,8 +2991,16 @@ async def update_driver_status(application_id: str, update: UpdateStatusRequest)
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Application not found")
     
+    admin_stats_cache.invalidate("stats")
     return {"success": True, "message": "Status updated"}
 
+@api_router.put("/admin/advertisers/bulk-status")
+async def bulk_update_advertiser_status(request: BulkStatusUpdateRequest):
+    """Set the status of many advertiser submissions, by id list or filter, in one write"""
+    if request.filter and request.filter.platform:
+        raise HTTPException(status_code=400, detail="Advertiser submissions have no platform")
+    return await bulk_update_status(db.advertiser_submissions, request, advertiser_filters)
+
 @api_router.put("/admin/advertisers/{submission_id}/status")
 async def update_advertiser_status(submission_id: str, update: UpdateStatusRequest):
     result = await db.advertiser_submissions.update_one(
@@ -569,8 +3011,30 @@ async def update_advertiser_status(submission_id: str, update: UpdateStatusReque
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Submission not found")
     
+    admin_stats_cache.invalidate("stats")
     return {"success": True, "message": "Status updated"}
 
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness: the process is serving; never touches MongoDB"""
+    return {"status": "ok", "pool": mongo_pool_monitor.stats()}
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    """Readiness: warmed up, not shutting down and able to reach MongoDB"""
+    pool = mongo_pool_monitor.stats()
+    if not app_ready.is_set():
+        return JSONResponse({"status": "starting", "pool": pool}, status_code=503)
+    try:
+        await asyncio.wait_for(client.admin.command("ping"), READY_PING_TIMEOUT)
+    except (asyncio.TimeoutError, PyMongoError) as e:
+        return JSONResponse({"status": "unavailable", "error": type(e).__name__, "pool": pool}, status_code=503)
+    return {"status": "ready", "pool": pool}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -580,7 +3044,9 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Configure logging
 logging.basicConfig(
@@ -589,8 +3055,81 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_db_indexes():
+    if ENSURE_INDEXES:
+        await ensure_indexes()
+
+# Set once startup has warmed up, cleared when shutdown starts so load balancers drain us
+app_ready = asyncio.Event()
+
+@app.on_event("startup")
+async def warm_up():
+    if WARMUP_ENABLED:
+        started = time.perf_counter()
+        try:
+            # Concurrent pings each need their own connection, so the pool opens min connections now
+            await asyncio.gather(*(client.admin.command("ping") for _ in range(max(MONGO_MIN_POOL_SIZE, 1))))
+            pages = await db.content_blocks.distinct("page", {"is_active": True})
+            results = await asyncio.gather(*(load_page(page) for page in pages), return_exceptions=True)
+            for page, result in zip(pages, results):
+                if isinstance(result, Exception):
+                    # e.g. a malformed block; only that page errors when requested
+                    logger.warning(f"Could not warm CMS page {page}: {result}")
+            await cms_snapshot.get()
+            logger.info(
+                f"Warmed up {mongo_pool_monitor.open} connections and {len(pages)} CMS pages "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+        except Exception as e:
+            # Serve anyway; the caches fill on demand and /readyz reports whether MongoDB is reachable
+            logger.warning(f"Startup warmup failed: {e}")
+    app_ready.set()
+
+# Long-running tasks started at startup and cancelled at shutdown
+background_tasks: List[asyncio.Task] = []
+
+@app.on_event("startup")
+async def start_cms_watcher():
+    if CMS_WATCH_ENABLED:
+        background_tasks.append(asyncio.create_task(watch_content_blocks()))
+
+@app.on_event("startup")
+async def start_insert_batchers():
+    if SUBMISSION_BATCHING:
+        insert_batchers.update({
+            "driver_applications": make_batcher("driver_applications", SUBMISSION_WRITE_CONCERN),
+            "advertiser_submissions": make_batcher("advertiser_submissions", SUBMISSION_WRITE_CONCERN),
+            "email_logs": make_batcher("email_logs", EMAIL_LOG_WRITE_CONCERN),
+        })
+        for batcher in insert_batchers.values():
+            background_tasks.append(asyncio.create_task(batcher.run()))
+
+@app.on_event("startup")
+async def start_blob_gc():
+    background_tasks.append(asyncio.create_task(collect_blobs()))
+    background_tasks.append(asyncio.create_task(collect_upload_sessions()))
+
+@app.on_event("startup")
+async def start_retention():
+    if any(days > 0 for _, days, _, _ in RETENTION_POLICIES.values()):
+        background_tasks.append(asyncio.create_task(run_retention()))
+
+@app.on_event("startup")
+async def start_email_outbox():
+    if SMTP_HOST:
+        background_tasks.append(asyncio.create_task(run_email_outbox()))
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app_ready.clear()
+    for task in background_tasks:
+        task.cancel()
+    # Let batchers flush what they already accepted before the client goes away
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    smtp_pool.close()
+    for executor in executors:
+        executor.shutdown()
     client.close()
 
 # Start the server
@@ -12,6 +12,7 @@ export const EmailLogs = () => {
   const [logs, setLogs] = useState([]);
   const [isLoading, setIsLoading] = useState(true);
   const [selectedLog, setSelectedLog] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
     fetchLogs();
@@ -22,6 +23,7 @@ export const EmailLogs = () => {
     try {
       const response = await axios.get(`${BACKEND_URL}/api/admin/email-logs`);
       setLogs(response.data);
+      setNextCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
       console.error('Failed to fetch logs:', error);
       toast.error('Failed to load email logs');
@@ -30,6 +32,16 @@ export const EmailLogs = () => {
     }
   };
 
+  const loadMore = async () => {
+    try {
+      const response = await axios.get(`${BACKEND_URL}/api/admin/email-logs`, { params: { cursor: nextCursor } });
+      setLogs(prev => [...prev, ...response.data]);
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (error) {
+      toast.error('Failed to load more email logs');
+    }
+  };
+
   const getLogTypeBadge = (type) => {
     const colors = {
       driver_application: 'bg-blue-100 text-blue-800',
@@ -107,6 +119,13 @@ export const EmailLogs = () => {
           </Card>
         ))
       )}
+      {nextCursor && (
+        <div className="text-center">
+          <Button variant="outline" onClick={loadMore} data-testid="load-more-logs">
+            Load more
+          </Button>
+        </div>
+      )}
     </div>
   );
 };
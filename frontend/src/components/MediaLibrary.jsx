@@ -72,13 +72,13 @@ export const MediaLibrary = () => {
   };
 
   const copyUrl = (mediaId, filename) => {
-    const url = `${BACKEND_URL}/api/cms/media/${mediaId}`;
+    const url = getImageUrl(mediaId);
     navigator.clipboard.writeText(url);
     toast.success(`URL copied: ${filename}`);
   };
 
   const getImageUrl = (mediaId) => {
-    return `${BACKEND_URL}/api/cms/media/${mediaId}`;
+    return `${BACKEND_URL}/api/cms/media/${mediaId}/raw`;
   };
 
   if (isLoading) {
@@ -117,7 +117,7 @@ export const MediaLibrary = () => {
                 <div 
                   className="w-full h-full bg-cover bg-center"
                   style={{
-                    backgroundImage: `url(data:${item.content_type};base64,${item.data})`
+                    backgroundImage: `url(${getImageUrl(item.id)})`
                   }}
                 />
               ) : (
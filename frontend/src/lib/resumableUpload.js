@@ -0,0 +1,57 @@
+import axios from 'axios';
+
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const PARALLEL_PARTS = 3;
+
+const sha256Hex = async (buffer) => {
+  const digest = await crypto.subtle.digest('SHA-256', buffer);
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, '0'))
+    .join('');
+};
+
+// Uploads a file in numbered parts, a few at a time; failed parts are re-sent
+// from the server's list of missing parts instead of restarting the whole file.
+export async function uploadResumable(file, { retries = 3 } = {}) {
+  const { data: session } = await axios.post(`${BACKEND_URL}/api/uploads`, {
+    filename: file.name,
+    content_type: file.type || 'application/octet-stream',
+    size: file.size,
+  });
+  const partUrl = (part) => `${BACKEND_URL}/api/uploads/${session.upload_id}/parts/${part}`;
+
+  const sendPart = async (part) => {
+    const start = part * session.part_size;
+    const body = await file.slice(start, start + session.part_size).arrayBuffer();
+    await axios.put(partUrl(part), body, {
+      headers: {
+        'Content-Type': 'application/octet-stream',
+        'X-Part-SHA256': await sha256Hex(body),
+      },
+    });
+  };
+
+  let missing = [...Array(session.part_count).keys()];
+  for (let attempt = 0; missing.length > 0 && attempt <= retries; attempt++) {
+    const queue = [...missing];
+    const worker = async () => {
+      while (queue.length > 0) {
+        const part = queue.shift();
+        try {
+          await sendPart(part);
+        } catch (error) {
+          // Left missing; the status check below schedules it again
+        }
+      }
+    };
+    await Promise.all(Array.from({ length: PARALLEL_PARTS }, worker));
+    const { data: status } = await axios.get(`${BACKEND_URL}/api/uploads/${session.upload_id}`);
+    missing = status.missing_parts;
+  }
+  if (missing.length > 0) {
+    throw new Error(`Upload incomplete, missing parts: ${missing.join(', ')}`);
+  }
+
+  const { data } = await axios.post(`${BACKEND_URL}/api/uploads/${session.upload_id}/complete`);
+  return data;
+}
@@ -17,6 +17,10 @@ const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 export default function AdminDashboard() {
   const [driverApps, setDriverApps] = useState([]);
   const [advertiserSubs, setAdvertiserSubs] = useState([]);
+  const [stats, setStats] = useState(null);
+  // Lists are paged; the API returns the next page's cursor in X-Next-Cursor
+  const [driverCursor, setDriverCursor] = useState(null);
+  const [advertiserCursor, setAdvertiserCursor] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
   const navigate = useNavigate();
 
@@ -32,13 +36,17 @@ export default function AdminDashboard() {
   const fetchData = async () => {
     setIsLoading(true);
     try {
-      const [driversRes, advertisersRes] = await Promise.all([
+      const [driversRes, advertisersRes, statsRes] = await Promise.all([
         axios.get(`${BACKEND_URL}/api/drivers/applications`),
-        axios.get(`${BACKEND_URL}/api/advertisers/submissions`)
+        axios.get(`${BACKEND_URL}/api/advertisers/submissions`),
+        axios.get(`${BACKEND_URL}/api/admin/stats`)
       ]);
       
       setDriverApps(driversRes.data);
+      setDriverCursor(driversRes.headers['x-next-cursor'] || null);
       setAdvertiserSubs(advertisersRes.data);
+      setAdvertiserCursor(advertisersRes.headers['x-next-cursor'] || null);
+      setStats(statsRes.data);
     } catch (error) {
       console.error('Fetch error:', error);
       toast.error('Failed to load data');
@@ -47,6 +55,16 @@ export default function AdminDashboard() {
     }
   };
 
+  const loadMore = async (listPath, cursor, setRows, setCursor) => {
+    try {
+      const response = await axios.get(`${BACKEND_URL}${listPath}`, { params: { cursor } });
+      setRows(prev => [...prev, ...response.data]);
+      setCursor(response.headers['x-next-cursor'] || null);
+    } catch (error) {
+      toast.error('Failed to load more rows');
+    }
+  };
+
   const handleLogout = () => {
     localStorage.removeItem('admin_token');
     toast.success('Logged out successfully');
@@ -73,29 +91,15 @@ export default function AdminDashboard() {
     }
   };
 
-  const exportToCSV = (data, filename) => {
+  const exportToCSV = (data, listPath) => {
     if (data.length === 0) {
       toast.error('No data to export');
       return;
     }
 
-    const headers = Object.keys(data[0]);
-    const csvContent = [
-      headers.join(','),
-      ...data.map(row => headers.map(header => {
-        const value = row[header] || '';
-        return `"${String(value).replace(/"/g, '""')}"`;
-      }).join(','))
-    ].join('\\n');
-
-    const blob = new Blob([csvContent], { type: 'text/csv' });
-    const url = window.URL.createObjectURL(blob);
-    const a = document.createElement('a');
-    a.href = url;
-    a.download = `${filename}_${new Date().toISOString().split('T')[0]}.csv`;
-    a.click();
-    window.URL.revokeObjectURL(url);
-    toast.success('CSV exported successfully');
+    // The backend streams the full export, not just the rows loaded here
+    window.location.href = `${BACKEND_URL}${listPath}/export?format=csv`;
+    toast.success('CSV export started');
   };
 
   const getStatusBadge = (status) => {
@@ -156,7 +160,7 @@ export default function AdminDashboard() {
               <div className="flex items-center justify-between">
                 <div>
                   <p className="text-sm text-gray-600 mb-1">Driver Applications</p>
-                  <p className="text-3xl font-bold text-gray-900">{driverApps.length}</p>
+                  <p className="text-3xl font-bold text-gray-900">{stats?.drivers.total ?? 0}</p>
                 </div>
                 <div className="w-12 h-12 bg-blue-100 rounded-lg flex items-center justify-center">
                   <Users className="text-blue-600" size={24} />
@@ -170,7 +174,7 @@ export default function AdminDashboard() {
               <div className="flex items-center justify-between">
                 <div>
                   <p className="text-sm text-gray-600 mb-1">Advertiser Inquiries</p>
-                  <p className="text-3xl font-bold text-gray-900">{advertiserSubs.length}</p>
+                  <p className="text-3xl font-bold text-gray-900">{stats?.advertisers.total ?? 0}</p>
                 </div>
                 <div className="w-12 h-12 bg-cyan-100 rounded-lg flex items-center justify-center">
                   <Briefcase className="text-cyan-600" size={24} />
@@ -185,7 +189,7 @@ export default function AdminDashboard() {
                 <div>
                   <p className="text-sm text-gray-600 mb-1">Pending Drivers</p>
                   <p className="text-3xl font-bold text-gray-900">
-                    {driverApps.filter(app => app.status === 'pending').length}
+                    {stats?.drivers.by_status.pending ?? 0}
                   </p>
                 </div>
                 <div className="w-12 h-12 bg-yellow-100 rounded-lg flex items-center justify-center">
@@ -201,7 +205,7 @@ export default function AdminDashboard() {
                 <div>
                   <p className="text-sm text-gray-600 mb-1">Pending Advertisers</p>
                   <p className="text-3xl font-bold text-gray-900">
-                    {advertiserSubs.filter(sub => sub.status === 'pending').length}
+                    {stats?.advertisers.by_status.pending ?? 0}
                   </p>
                 </div>
                 <div className="w-12 h-12 bg-green-100 rounded-lg flex items-center justify-center">
@@ -243,7 +247,7 @@ export default function AdminDashboard() {
               <CardHeader className="flex flex-row items-center justify-between">
                 <CardTitle>Driver Applications</CardTitle>
                 <Button 
-                  onClick={() => exportToCSV(driverApps, 'driver_applications')}
+                  onClick={() => exportToCSV(driverApps, '/api/drivers/applications')}
                   variant="outline"
                   size="sm"
                   data-testid="export-drivers-button"
@@ -302,6 +306,17 @@ export default function AdminDashboard() {
                       No driver applications yet
                     </div>
                   )}
+                  {driverCursor && (
+                    <div className="text-center py-4">
+                      <Button
+                        variant="outline"
+                        onClick={() => loadMore('/api/drivers/applications', driverCursor, setDriverApps, setDriverCursor)}
+                        data-testid="load-more-drivers"
+                      >
+                        Load more
+                      </Button>
+                    </div>
+                  )}
                 </div>
               </CardContent>
             </Card>
@@ -313,7 +328,7 @@ export default function AdminDashboard() {
               <CardHeader className="flex flex-row items-center justify-between">
                 <CardTitle>Advertiser Inquiries</CardTitle>
                 <Button 
-                  onClick={() => exportToCSV(advertiserSubs, 'advertiser_submissions')}
+                  onClick={() => exportToCSV(advertiserSubs, '/api/advertisers/submissions')}
                   variant="outline"
                   size="sm"
                   data-testid="export-advertisers-button"
@@ -370,6 +385,17 @@ export default function AdminDashboard() {
                       No advertiser inquiries yet
                     </div>
                   )}
+                  {advertiserCursor && (
+                    <div className="text-center py-4">
+                      <Button
+                        variant="outline"
+                        onClick={() => loadMore('/api/advertisers/submissions', advertiserCursor, setAdvertiserSubs, setAdvertiserCursor)}
+                        data-testid="load-more-advertisers"
+                      >
+                        Load more
+                      </Button>
+                    </div>
+                  )}
                 </div>
               </CardContent>
             </Card>
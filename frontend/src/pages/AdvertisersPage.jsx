@@ -11,8 +11,11 @@ import { Checkbox } from '@/components/ui/checkbox';
 import { Target, Eye, BarChart3, CheckCircle2 } from 'lucide-react';
 import { toast } from 'sonner';
 import axios from 'axios';
+import { uploadResumable } from '@/lib/resumableUpload';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+// Larger creatives (typically video) go through the resumable upload API
+const RESUMABLE_THRESHOLD = 8 * 1024 * 1024;
 
 export default function AdvertisersPage() {
   const [formData, setFormData] = useState({
@@ -54,7 +57,9 @@ export default function AdvertisersPage() {
       let creativeId = null;
 
       // Upload file if present
-      if (file) {
+      if (file && file.size > RESUMABLE_THRESHOLD) {
+        creativeId = (await uploadResumable(file)).file_id;
+      } else if (file) {
         const fileFormData = new FormData();
         fileFormData.append('file', file);
 
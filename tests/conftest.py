@@ -0,0 +1,24 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# server.py reads these at import; nothing connects until a query runs
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Swap the app's database for an in-memory one"""
+    from mongomock_motor import AsyncMongoMockClient, AsyncMongoMockCollection
+
+    import server
+
+    # mongomock ignores write concerns, and its with_options hands back a synchronous collection
+    monkeypatch.setattr(AsyncMongoMockCollection, "with_options", lambda self, **options: self, raising=False)
+    mock_db = AsyncMongoMockClient()[os.environ["DB_NAME"]]
+    monkeypatch.setattr(server, "db", mock_db)
+    return mock_db
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import uuid
+
+import httpx
+import pytest
+from bson import ObjectId
+
+import server
+
+
+@pytest.fixture
+def deleted(monkeypatch):
+    """GridFS ids register_blob drops as duplicates"""
+    ids = []
+
+    async def delete_stored_file(storage_id):
+        ids.append(storage_id)
+
+    monkeypatch.setattr(server, "delete_stored_file", delete_stored_file)
+    return ids
+
+
+def blob_headers(sha256):
+    """Headers of a conditional GET, answered from blob metadata without reading GridFS"""
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(f"/api/blobs/{sha256}", headers={"If-None-Match": f'"{sha256}"'})
+        assert response.status_code == 304
+        return response.headers
+
+    return asyncio.run(run())
+
+
+def register(sha256, private=False):
+    return asyncio.run(server.register_blob(str(ObjectId()), sha256, 3, "image/png", private))
+
+
+def test_cms_media_blobs_cache_publicly(db, deleted):
+    register("a" * 64)
+    assert blob_headers("a" * 64)["Cache-Control"].startswith("public")
+
+
+def test_uploaded_blobs_stay_private(db, deleted):
+    register("b" * 64, private=True)
+    assert blob_headers("b" * 64)["Cache-Control"] == "private, no-cache"
+
+
+def test_a_private_reference_makes_shared_bytes_private(db, deleted):
+    register("c" * 64)
+    register("c" * 64, private=True)
+    register("c" * 64)
+    assert blob_headers("c" * 64)["Cache-Control"] == "private, no-cache"
+
+
+def blob(sha256):
+    async def run():
+        return await server.db.blobs.find_one({"_id": sha256})
+    return asyncio.run(run())
+
+
+def gc_pass(monkeypatch, grace):
+    monkeypatch.setattr(server, "BLOB_GC_INTERVAL", 0)
+    monkeypatch.setattr(server, "BLOB_GC_GRACE", grace)
+
+    async def run():
+        gc = asyncio.create_task(server.collect_blobs())
+        await asyncio.sleep(0.05)
+        gc.cancel()
+    asyncio.run(run())
+
+
+def release(*sha256s):
+    asyncio.run(server.release_stored_files([{"sha256": sha256} for sha256 in sha256s]))
+
+
+def test_identical_uploads_share_one_stored_copy(db, deleted):
+    first, second = str(ObjectId()), str(ObjectId())
+
+    async def run():
+        return (await server.register_blob(first, "d" * 64, 3, "image/png"),
+                await server.register_blob(second, "d" * 64, 3, "image/png"))
+
+    assert asyncio.run(run()) == (first, first)
+    assert deleted == [second]
+    assert blob("d" * 64)["ref_count"] == 2
+
+
+def test_concurrent_first_uploads_both_take_a_reference(db, deleted, monkeypatch):
+    from mongomock_motor import AsyncMongoMockCollection
+
+    find_one_and_update = AsyncMongoMockCollection.find_one_and_update
+    theirs, ours = str(ObjectId()), str(ObjectId())
+
+    async def lose_the_insert_race(self, *args, **kwargs):
+        if not await db.blobs.find_one({"_id": "e" * 64}):
+            # The other upload's upsert lands between our lookup and our insert
+            await db.blobs.insert_one({"_id": "e" * 64, "ref_count": 1, "storage_id": theirs})
+            raise server.DuplicateKeyError("E11000 duplicate key error")
+        return await find_one_and_update(self, *args, **kwargs)
+
+    monkeypatch.setattr(AsyncMongoMockCollection, "find_one_and_update", lose_the_insert_race)
+    assert asyncio.run(server.register_blob(ours, "e" * 64, 3, "image/png")) == theirs
+    assert blob("e" * 64)["ref_count"] == 2
+    assert deleted == [ours]
+
+
+def test_releasing_one_reference_keeps_the_bytes(db, deleted, monkeypatch):
+    register("f" * 64)
+    register("f" * 64)
+    release("f" * 64)
+    gc_pass(monkeypatch, grace=0)
+    assert blob("f" * 64)["ref_count"] == 1
+    assert len(deleted) == 1  # only the duplicate copy of the second upload
+
+
+def test_unreferenced_blob_is_collected_after_the_grace_period(db, deleted, monkeypatch):
+    storage_id = register("1" * 64)
+    release("1" * 64)
+    gc_pass(monkeypatch, grace=3600)
+    assert blob("1" * 64)["ref_count"] == 0
+    assert deleted == []
+    gc_pass(monkeypatch, grace=0)
+    assert blob("1" * 64) is None
+    assert deleted == [storage_id]
+
+
+def test_blob_revived_during_the_grace_period_is_kept(db, deleted, monkeypatch):
+    storage_id = register("2" * 64)
+    release("2" * 64)
+    assert register("2" * 64) == storage_id
+    gc_pass(monkeypatch, grace=0)
+    assert blob("2" * 64)["ref_count"] == 1
+    assert storage_id not in deleted
+
+
+def test_records_from_before_deduplication_delete_their_own_bytes(db, monkeypatch):
+    dropped = []
+
+    async def delete_stored_files(storage_ids):
+        dropped.extend(storage_ids)
+
+    monkeypatch.setattr(server, "delete_stored_files", delete_stored_files)
+    asyncio.run(server.release_stored_files([{"storage_id": "legacy"}, {"storage_id": "x", "sha256": "3" * 64}]))
+    assert dropped == ["legacy"]
+
+
+# A MongoDB server, since GridFS can't run in memory
+MONGO_URL = os.environ.get("TEST_MONGO_URL")
+
+
+@pytest.mark.skipif(not MONGO_URL, reason="set TEST_MONGO_URL to a MongoDB server")
+def test_media_bytes_survive_until_the_last_copy_is_deleted(monkeypatch):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    monkeypatch.setattr(server, "BLOB_GC_INTERVAL", 0)
+    monkeypatch.setattr(server, "BLOB_GC_GRACE", 0)
+    payload = os.urandom(1000)
+
+    async def run():
+        client = AsyncIOMotorClient(MONGO_URL)
+        db = client[f"test_blobs_{uuid.uuid4().hex[:8]}"]
+        monkeypatch.setattr(server, "db", db)
+        server.get_fs_bucket.cache_clear()
+        transport = httpx.ASGITransport(app=server.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as api:
+                ids = []
+                for _ in range(2):
+                    response = await api.post("/api/cms/media", files={"file": ("a.bin", payload, "text/plain")})
+                    ids.append(response.json()["id"])
+                assert await db["fs.files"].count_documents({}) == 1
+                await api.delete(f"/api/cms/media/{ids[0]}")
+                assert (await api.get(f"/api/cms/media/{ids[1]}/raw")).content == payload
+                await api.delete(f"/api/cms/media/{ids[1]}")
+                gc = asyncio.create_task(server.collect_blobs())
+                await asyncio.sleep(0.5)
+                gc.cancel()
+                assert await db["fs.files"].count_documents({}) == 0
+                assert await db["fs.chunks"].count_documents({}) == 0
+        finally:
+            server.get_fs_bucket.cache_clear()
+            await client.drop_database(db.name)
+            client.close()
+
+    asyncio.run(run())
@@ -0,0 +1,130 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from pymongo.errors import OperationFailure
+
+import server
+
+# A single-node replica set, e.g. `mongod --replSet rs0` followed by `rs.initiate()`
+REPLSET_URL = os.environ.get("TEST_MONGO_REPLSET_URL")
+
+
+@pytest.fixture
+def page_cache(monkeypatch):
+    cache = server.PageCache(ttl=60, max_entries=10)
+    monkeypatch.setattr(server, "cms_page_cache", cache)
+    for page in ("home", "about"):
+        cache.set(page, page.encode(), cache.version(page))
+    return cache
+
+
+def block(page, **fields):
+    now = datetime.now(timezone.utc).isoformat()
+    return {"id": str(uuid.uuid4()), "page": page, "section": "hero", "content": {},
+            "order": 0, "created_at": now, "updated_at": now, **fields}
+
+
+@pytest.mark.parametrize("change, dropped", [
+    ({"operationType": "insert", "fullDocument": {"page": "home"}}, {"home"}),
+    ({"operationType": "update", "fullDocument": {"page": "home"},
+      "updateDescription": {"updatedFields": {"content": {}}}}, {"home"}),
+    # Moved to another page: the page it left isn't in the event
+    ({"operationType": "update", "fullDocument": {"page": "home"},
+      "updateDescription": {"updatedFields": {"page": "home"}}}, {"home", "about"}),
+    ({"operationType": "delete"}, {"home", "about"}),
+    ({"operationType": "update", "fullDocument": None}, {"home", "about"}),
+])
+def test_invalidate_for_change(page_cache, change, dropped):
+    server.invalidate_for_change(change)
+    assert {page for page in ("home", "about") if page_cache.get(page) is None} == dropped
+
+
+def test_standalone_server_falls_back_to_polling(db, page_cache, monkeypatch):
+    def no_change_streams(*args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+    from mongomock_motor import AsyncMongoMockCollection
+
+    monkeypatch.setattr(AsyncMongoMockCollection, "watch", no_change_streams, raising=False)
+    monkeypatch.setattr(server, "CMS_WATCH_POLL_INTERVAL", 0.01)
+
+    async def run():
+        await db.content_blocks.insert_one(block("home", updated_at="2024-01-01T00:00:00+00:00"))
+        watcher = asyncio.create_task(server.watch_content_blocks())
+        await asyncio.sleep(0.05)
+        assert page_cache.get("home") == b"home"
+        await db.content_blocks.insert_one(block("about"))
+        await asyncio.sleep(0.05)
+        assert not watcher.done()
+        watcher.cancel()
+
+    asyncio.run(run())
+    assert page_cache.get("about") is None
+    assert page_cache.get("home") == b"home"
+
+
+@pytest.mark.skipif(not REPLSET_URL, reason="set TEST_MONGO_REPLSET_URL to a replica set")
+def test_change_stream_invalidates_pages(page_cache, monkeypatch):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def run():
+        client = AsyncIOMotorClient(REPLSET_URL)
+        db = client[f"test_cms_watch_{uuid.uuid4().hex[:8]}"]
+        monkeypatch.setattr(server, "db", db)
+        doc = block("home")
+        await db.content_blocks.insert_one(dict(doc))
+        page_cache.invalidate("home")
+        page_cache.set("home", b"home", page_cache.version("home"))
+        watcher = asyncio.create_task(server.watch_content_blocks())
+        try:
+            await asyncio.sleep(0.5)  # let the stream open before writing
+            await db.content_blocks.update_one({"id": doc["id"]}, {"$set": {"content": {"title": "New"}}})
+            for _ in range(50):
+                if page_cache.get("home") is None:
+                    break
+                await asyncio.sleep(0.1)
+            assert page_cache.get("home") is None
+            assert page_cache.get("about") == b"about"
+        finally:
+            watcher.cancel()
+            await client.drop_database(db.name)
+            client.close()
+
+    asyncio.run(run())
+
+
+def test_lasting_stream_failure_backs_off(db, page_cache, monkeypatch):
+    from mongomock_motor import AsyncMongoMockCollection
+
+    opened = []
+
+    class BrokenStream:
+        """Opens, then fails like a stream whose resume point or privileges are gone"""
+        resume_token = None
+
+        async def __aenter__(self):
+            opened.append(True)
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            raise OperationFailure("Unauthorized", code=13)
+
+    monkeypatch.setattr(AsyncMongoMockCollection, "watch", lambda self, **kwargs: BrokenStream(), raising=False)
+    monkeypatch.setattr(server, "CMS_WATCH_POLL_INTERVAL", 0.05)
+
+    async def run():
+        watcher = asyncio.create_task(server.watch_content_blocks())
+        await asyncio.sleep(0.2)
+        watcher.cancel()
+
+    asyncio.run(run())
+    assert 2 <= len(opened) <= 6
@@ -0,0 +1,171 @@
+import asyncio
+import socket
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from aiosmtpd.controller import Controller
+
+import server
+
+
+class Recorder:
+    """aiosmtpd handler keeping what it receives, refusing recipients at `reject`"""
+
+    def __init__(self, reject=None):
+        self.messages = []
+        self.reject = reject
+
+    async def handle_RCPT(self, smtp, session, envelope, address, rcpt_options):
+        if address == self.reject:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, smtp, session, envelope):
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    handler = Recorder(reject="nobody@example.com")
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    monkeypatch.setattr(server, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(server, "SMTP_PORT", controller.port)
+    monkeypatch.setattr(server, "smtp_pool", server.SMTPPool(2))
+    yield handler
+    server.smtp_pool.close()
+    controller.stop()
+
+
+@pytest.fixture
+def no_smtp(monkeypatch):
+    monkeypatch.setattr(server, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(server, "SMTP_PORT", free_port())
+    monkeypatch.setattr(server, "smtp_pool", server.SMTPPool(2))
+
+
+def queued(recipient="ops@example.com", **fields):
+    doc = server.new_email_log("driver_application", recipient, "New application", "Body", {}).model_dump()
+    doc.update(fields)
+    return doc
+
+
+def test_claim_takes_due_emails_and_expired_leases(db):
+    now = datetime.now(timezone.utc)
+    past, future = (now - timedelta(minutes=1)).isoformat(), (now + timedelta(minutes=1)).isoformat()
+    docs = {
+        "due": queued(next_attempt_at=past),
+        "later": queued(next_attempt_at=future),
+        "stalled": queued(status="sending", lease_until=past, attempts=1),
+        "leased": queued(status="sending", lease_until=future, attempts=1),
+        "sent": queued(status="sent", next_attempt_at=past),
+    }
+
+    async def run():
+        await db.email_logs.insert_many([dict(doc) for doc in docs.values()])
+        claimed = []
+        while (doc := await server.claim_email(now)) is not None:
+            claimed.append(doc)
+        return claimed, await db.email_logs.find({"status": "sending"}, {"_id": 0}).to_list(None)
+
+    claimed, sending = asyncio.run(run())
+    assert {doc["id"] for doc in claimed} == {docs["due"]["id"], docs["stalled"]["id"]}
+    assert {doc["id"]: doc["attempts"] for doc in claimed} == {docs["due"]["id"]: 1, docs["stalled"]["id"]: 2}
+    assert all(doc["lease_until"] > now.isoformat() for doc in claimed)
+    assert len(sending) == 3
+
+
+def test_delivery_marks_sent(db, smtp):
+    async def run():
+        await db.email_logs.insert_one(queued())
+        doc = await server.claim_email(datetime.now(timezone.utc))
+        await server.deliver_email(doc)
+        return await db.email_logs.find_one({"id": doc["id"]})
+
+    doc = asyncio.run(run())
+    assert doc["status"] == "sent"
+    assert doc["sent_at"] and doc["last_error"] is None
+    assert "lease_until" not in doc
+    assert smtp.messages[0].rcpt_tos == ["ops@example.com"]
+
+
+def test_failed_delivery_backs_off(db, no_smtp):
+    async def run():
+        await db.email_logs.insert_one(queued(attempts=2))
+        doc = await server.claim_email(datetime.now(timezone.utc))
+        await server.deliver_email(doc)
+        return await db.email_logs.find_one({"id": doc["id"]})
+
+    before = datetime.now(timezone.utc)
+    doc = asyncio.run(run())
+    assert doc["status"] == "logged" and doc["attempts"] == 3
+    assert doc["last_error"]
+    delay = datetime.fromisoformat(doc["next_attempt_at"]) - before
+    expected = server.EMAIL_RETRY_BASE * 4
+    assert expected <= delay.total_seconds() < expected + 5
+
+
+def test_delivery_gives_up_after_max_attempts(db, no_smtp):
+    async def run():
+        await db.email_logs.insert_one(queued(attempts=server.EMAIL_MAX_ATTEMPTS - 1))
+        doc = await server.claim_email(datetime.now(timezone.utc))
+        await server.deliver_email(doc)
+        return await db.email_logs.find_one({"id": doc["id"]})
+
+    doc = asyncio.run(run())
+    assert doc["status"] == "failed"
+    assert doc["attempts"] == server.EMAIL_MAX_ATTEMPTS
+
+
+def test_rejected_recipient_closes_the_connection(db, smtp):
+    async def run():
+        await db.email_logs.insert_one(queued())
+        await server.deliver_email(await server.claim_email(datetime.now(timezone.utc)))
+        conn = server.smtp_pool._idle[0]
+        await db.email_logs.insert_one(queued(recipient="nobody@example.com"))
+        await server.deliver_email(await server.claim_email(datetime.now(timezone.utc)))
+        statuses = {doc["recipient"]: doc["status"] async for doc in db.email_logs.find()}
+        return conn, statuses
+
+    conn, statuses = asyncio.run(run())
+    assert statuses == {"ops@example.com": "sent", "nobody@example.com": "logged"}
+    # The reused connection that saw the error is closed, not leaked or pooled
+    assert conn.sock is None
+    assert server.smtp_pool._idle == []
+
+
+def test_outbox_survives_unexpected_errors(db, smtp, monkeypatch):
+    claim_email = server.claim_email
+    calls = []
+
+    async def flaky_claim(now):
+        calls.append(now)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return await claim_email(now)
+
+    monkeypatch.setattr(server, "claim_email", flaky_claim)
+    monkeypatch.setattr(server, "EMAIL_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(server, "outbox_wakeup", None)
+
+    async def run():
+        server.outbox_wakeup = asyncio.Event()
+        await db.email_logs.insert_one(queued())
+        worker = asyncio.create_task(server.run_email_outbox())
+        for _ in range(200):
+            if await db.email_logs.count_documents({"status": "sent"}):
+                break
+            await asyncio.sleep(0.01)
+        assert not worker.done()
+        worker.cancel()
+
+    asyncio.run(run())
+    assert len(smtp.messages) == 1
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+from pymongo.errors import AutoReconnect, WriteError
+
+from server import InsertBatcher
+
+
+class Recording:
+    """Collection stand-in that records the batches it is given"""
+
+    def __init__(self, collection, fail_with=None):
+        self.collection = collection
+        self.batches = []
+        self.fail_with = fail_with
+
+    async def insert_many(self, docs, ordered=True):
+        self.batches.append(len(docs))
+        if self.fail_with:
+            raise self.fail_with
+        return await self.collection.insert_many(docs, ordered=ordered)
+
+
+def run_batcher(collection, docs, **options):
+    """Enqueue docs without yielding, then gather each caller's outcome"""
+    async def run():
+        batcher = InsertBatcher(collection, **{"max_batch": 3, "max_delay": 0.01, "max_pending": 100, **options})
+        worker = asyncio.create_task(batcher.run())
+        futures = [batcher.enqueue(doc) for doc in docs]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        worker.cancel()
+        return results
+
+    return asyncio.run(run())
+
+
+def test_inserts_are_coalesced_into_batches(db):
+    collection = Recording(db.driver_applications)
+    results = run_batcher(collection, [{"id": str(n)} for n in range(7)])
+    assert results == [None] * 7
+    assert collection.batches == [3, 3, 1]
+
+    async def count():
+        return await db.driver_applications.count_documents({})
+    assert asyncio.run(count()) == 7
+
+
+def test_write_error_fails_only_its_own_caller(db):
+    async def setup():
+        await db.driver_applications.create_index("id", unique=True)
+        await db.driver_applications.insert_one({"id": "taken"})
+    asyncio.run(setup())
+
+    results = run_batcher(db.driver_applications, [{"id": "a"}, {"id": "taken"}, {"id": "b"}])
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], WriteError)
+
+
+def test_connection_error_fails_the_whole_batch(db):
+    collection = Recording(db.driver_applications, fail_with=AutoReconnect("gone"))
+    results = run_batcher(collection, [{"id": "a"}, {"id": "b"}])
+    assert all(isinstance(result, AutoReconnect) for result in results)
+
+
+def test_queue_is_bounded():
+    async def run():
+        batcher = InsertBatcher(None, max_batch=3, max_delay=0.01, max_pending=2)
+        batcher.enqueue({"id": "a"})
+        batcher.enqueue({"id": "b"})
+        assert batcher.full()
+        with pytest.raises(asyncio.QueueFull):
+            batcher.enqueue({"id": "c"})
+
+    asyncio.run(run())
+
+
+def test_cancelling_flushes_pending_documents(db):
+    async def run():
+        batcher = InsertBatcher(db.driver_applications, max_batch=10, max_delay=60, max_pending=100)
+        worker = asyncio.create_task(batcher.run())
+        futures = [batcher.enqueue({"id": str(n)}) for n in range(3)]
+        await asyncio.sleep(0.01)  # the worker now waits for the batch to fill
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        return [future.result() for future in futures], await db.driver_applications.count_documents({})
+
+    results, stored = asyncio.run(run())
+    assert results == [None] * 3
+    assert stored == 3
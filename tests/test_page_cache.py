@@ -0,0 +1,58 @@
+from server import PageCache
+
+
+def test_get_returns_what_was_set():
+    cache = PageCache(ttl=60, max_entries=10)
+    cache.set("home", b"[1]", cache.version("home"))
+    assert cache.get("home") == b"[1]"
+    assert cache.get("about") is None
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("server.time.monotonic", lambda: now[0])
+    cache = PageCache(ttl=5, max_entries=10)
+    cache.set("home", b"[1]", cache.version("home"))
+    now[0] += 4
+    assert cache.get("home") == b"[1]"
+    now[0] += 2
+    assert cache.get("home") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PageCache(ttl=60, max_entries=2)
+    for key in ("a", "b"):
+        cache.set(key, key.encode(), cache.version(key))
+    cache.get("a")
+    cache.set("c", b"c", cache.version("c"))
+    assert cache.get("a") == b"a"
+    assert cache.get("b") is None
+    assert cache.get("c") == b"c"
+
+
+def test_invalidate_drops_the_entry_and_refuses_stale_writes():
+    cache = PageCache(ttl=60, max_entries=10)
+    cache.set("home", b"old", cache.version("home"))
+    version = cache.version("home")  # a reader starts its query
+    cache.invalidate("home")  # a write lands meanwhile
+    assert cache.get("home") is None
+    cache.set("home", b"stale", version)
+    assert cache.get("home") is None
+    cache.set("home", b"fresh", cache.version("home"))
+    assert cache.get("home") == b"fresh"
+
+
+def test_clear_refuses_writes_read_before_it():
+    cache = PageCache(ttl=60, max_entries=10)
+    version = cache.version("home")
+    revision = cache.revision
+    cache.clear()
+    cache.set("home", b"stale", version)
+    assert cache.get("home") is None
+    assert cache.revision > revision
+
+
+def test_disabled_cache_stores_nothing():
+    for cache in (PageCache(ttl=0, max_entries=10), PageCache(ttl=60, max_entries=0)):
+        cache.set("home", b"[1]", cache.version("home"))
+        assert cache.get("home") is None
@@ -0,0 +1,62 @@
+import asyncio
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from server import decode_cursor, encode_cursor, field_names
+
+
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+def test_cursor_round_trips():
+    assert decode_cursor(encode_cursor("2024-01-01T00:00:00", "abc")) == ("2024-01-01T00:00:00", "abc")
+    assert decode_cursor(encode_cursor(1.5, "abc"), (int, float)) == (1.5, "abc")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    raw_cursor({"a": 1}),
+    raw_cursor(["only one"]),
+    raw_cursor([{"$gt": ""}, "x"]),
+    raw_cursor(["2024-01-01", {"$ne": None}]),
+    raw_cursor([3, "x"]),
+    raw_cursor([None, "x"]),
+])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize("value", ["1.0", True, [1]])
+def test_search_cursor_needs_a_numeric_score(value):
+    with pytest.raises(HTTPException):
+        decode_cursor(raw_cursor([value, "x"]), (int, float))
+
+
+def test_field_names_drop_id_and_operators():
+    assert field_names(" name, _id,,$where, city ") == ["name", "city"]
+
+
+def test_paginate_walks_pages_and_never_returns_object_ids(db):
+    async def run():
+        await db.driver_applications.insert_many([
+            {"id": f"d{n}", "name": f"Driver {n}", "submitted_at": f"2024-01-0{n}"} for n in range(1, 6)
+        ])
+        seen, cursor = [], None
+        while True:
+            docs, cursor = await server.paginate(
+                db.driver_applications, {}, "submitted_at", 2, cursor, "_id,name,$where"
+            )
+            seen.extend(docs)
+            if not cursor:
+                return seen
+
+    docs = asyncio.run(run())
+    assert [doc["id"] for doc in docs] == ["d5", "d4", "d3", "d2", "d1"]
+    assert all(set(doc) == {"id", "name", "submitted_at"} for doc in docs)
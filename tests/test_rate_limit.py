@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+import server
+from server import MemoryRateLimitBackend, SingleFlight, parse_rate
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("server.time.monotonic", lambda: now[0])
+    return now
+
+
+def take(backend, key, rate=1.0, burst=2):
+    return asyncio.run(backend.take(key, rate, burst))
+
+
+@pytest.mark.parametrize("spec, expected", [("5/60", (5 / 60, 5)), ("120/60", (2.0, 120)), ("10", (10.0, 10))])
+def test_parse_rate(spec, expected):
+    assert parse_rate(spec) == expected
+
+
+def test_bucket_allows_a_burst_then_refills(clock):
+    backend = MemoryRateLimitBackend(max_keys=10)
+    assert take(backend, "a") == (True, 0.0)
+    assert take(backend, "a") == (True, 0.0)
+    allowed, retry_after = take(backend, "a")
+    assert not allowed and retry_after == pytest.approx(1.0)
+    assert take(backend, "b")[0]  # other clients have their own bucket
+    clock[0] += 0.5
+    allowed, retry_after = take(backend, "a")
+    assert not allowed and retry_after == pytest.approx(0.5)
+    clock[0] += 0.5
+    assert take(backend, "a")[0]
+
+
+def test_bucket_never_holds_more_than_the_burst(clock):
+    backend = MemoryRateLimitBackend(max_keys=10)
+    take(backend, "a")
+    clock[0] += 3600
+    assert [take(backend, "a")[0] for _ in range(3)] == [True, True, False]
+
+
+def test_least_recently_used_keys_are_evicted(clock):
+    backend = MemoryRateLimitBackend(max_keys=2)
+    for key in ("a", "b", "c"):
+        take(backend, key, burst=1)
+    assert list(backend._buckets) == ["b", "c"]
+    assert take(backend, "a", burst=1)[0]  # forgotten, so it starts full again
+
+
+def request_from(host, forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": (host, 1234)})
+
+
+@pytest.mark.parametrize("hops, forwarded, expected", [
+    (0, "203.0.113.9", "10.0.0.1"),
+    (1, None, "10.0.0.1"),
+    (1, "203.0.113.9", "203.0.113.9"),
+    # A client-supplied entry ahead of the ingress's is ignored
+    (1, "198.51.100.7, 203.0.113.9", "203.0.113.9"),
+    (2, "198.51.100.7, 203.0.113.9", "198.51.100.7"),
+    (3, "203.0.113.9", "203.0.113.9"),
+])
+def test_client_ip(monkeypatch, hops, forwarded, expected):
+    monkeypatch.setattr(server, "TRUSTED_PROXY_HOPS", hops)
+    assert server.client_ip(request_from("10.0.0.1", forwarded)) == expected
+
+
+def test_single_flight_shares_one_call():
+    calls = []
+
+    async def load(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("home", load, "home") for _ in range(5)), flight.do("about", load, "about"))
+        again = await flight.do("home", load, "home")
+        return results, again
+
+    results, again = asyncio.run(run())
+    assert results == ["HOME"] * 5 + ["ABOUT"]
+    assert again == "HOME"
+    assert calls == ["home", "about", "home"]
+
+
+def test_single_flight_survives_a_cancelled_caller():
+    async def load():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        flight = SingleFlight()
+        first = asyncio.ensure_future(flight.do("home", load))
+        second = asyncio.ensure_future(flight.do("home", load))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
@@ -0,0 +1,285 @@
+import asyncio
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from bson import ObjectId
+
+import server
+
+PART = server.RESUMABLE_PART_SIZE
+
+
+@pytest.fixture
+def api(db, monkeypatch):
+    """Run a coroutine taking an API client, against the in-memory database"""
+    monkeypatch.setattr(server, "RATE_LIMIT_ENABLED", False)
+
+    def run(scenario):
+        async def main():
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await scenario(client)
+        return asyncio.run(main())
+
+    return run
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+async def initiate(client, data):
+    response = await client.post("/api/uploads", json={"filename": "creative.mp4", "content_type": "video/mp4",
+                                                        "size": len(data), "sha256": sha256(data)})
+    assert response.status_code == 201
+    return response.json()["upload_id"]
+
+
+async def put_part(client, upload_id, part, body, checksum=None):
+    return await client.put(f"/api/uploads/{upload_id}/parts/{part}", content=body,
+                            headers={"X-Part-SHA256": checksum or sha256(body)})
+
+
+async def upload_parts(client, data, parts=None):
+    upload_id = await initiate(client, data)
+    for part in parts if parts is not None else reversed(range(-(-len(data) // PART))):
+        response = await put_part(client, upload_id, part, data[part * PART:(part + 1) * PART])
+        assert response.status_code == 200
+    return upload_id
+
+
+async def session_doc(upload_id):
+    return await server.db.upload_sessions.find_one({"id": upload_id}, {"_id": 0})
+
+
+async def chunk_count(upload_id):
+    session = await session_doc(upload_id)
+    return await server.db["fs.chunks"].count_documents({"files_id": ObjectId(session["storage_id"])})
+
+
+DATA = os.urandom(PART + 1000)
+
+
+def test_parts_in_any_order_complete_into_one_file(api):
+    async def scenario(client):
+        upload_id = await upload_parts(client, DATA)
+        status = (await client.get(f"/api/uploads/{upload_id}")).json()
+        assert status["status"] == "open"
+        response = await client.post(f"/api/uploads/{upload_id}/complete")
+        assert response.status_code == 200
+        file_id = response.json()["file_id"]
+        session = await session_doc(upload_id)
+        upload = await server.db.file_uploads.find_one({"id": file_id})
+        blob = await server.db.blobs.find_one({"_id": sha256(DATA)})
+        stored = await server.db["fs.files"].find_one({"_id": ObjectId(session["storage_id"])})
+        return session, upload, blob, stored
+
+    session, upload, blob, stored = api(scenario)
+    assert session["status"] == "complete"
+    assert upload["sha256"] == sha256(DATA) and upload["size"] == len(DATA)
+    assert blob["ref_count"] == 1 and blob["private"] is True
+    assert stored["length"] == len(DATA)
+
+
+@pytest.mark.parametrize("body, checksum, status", [
+    (DATA[:PART - 1], None, 400),
+    (DATA[:PART] + b"x", None, 413),
+    (DATA[:PART], "0" * 64, 422),
+])
+def test_bad_parts_are_rejected_and_leave_no_chunks(api, body, checksum, status):
+    async def scenario(client):
+        upload_id = await initiate(client, DATA)
+        response = await put_part(client, upload_id, 0, body, checksum)
+        return response.status_code, await chunk_count(upload_id), await session_doc(upload_id)
+
+    code, chunks, session = api(scenario)
+    assert code == status
+    assert chunks == 0
+    assert session["parts"] == {}
+
+
+def test_out_of_range_part_is_rejected(api):
+    async def scenario(client):
+        upload_id = await initiate(client, DATA)
+        return (await put_part(client, upload_id, 2, b"x")).status_code
+
+    assert api(scenario) == 400
+
+
+def test_retried_part_replaces_the_first_attempt(api):
+    other = os.urandom(PART)
+
+    async def scenario(client):
+        upload_id = await initiate(client, DATA)
+        await put_part(client, upload_id, 0, other)
+        for part in (0, 1):
+            assert (await put_part(client, upload_id, part, DATA[part * PART:(part + 1) * PART])).status_code == 200
+        response = await client.post(f"/api/uploads/{upload_id}/complete")
+        return response, await chunk_count(upload_id)
+
+    response, chunks = api(scenario)
+    assert response.status_code == 200
+    assert chunks == -(-len(DATA) // server.UPLOAD_CHUNK_SIZE)
+
+
+def test_complete_needs_every_part(api):
+    async def scenario(client):
+        upload_id = await upload_parts(client, DATA, parts=[1])
+        return await client.post(f"/api/uploads/{upload_id}/complete")
+
+    response = api(scenario)
+    assert response.status_code == 409
+    assert "Missing parts: [0]" in response.json()["detail"]
+
+
+def test_missing_chunk_reopens_the_session(api):
+    async def scenario(client):
+        upload_id = await upload_parts(client, DATA)
+        session = await session_doc(upload_id)
+        await server.db["fs.chunks"].delete_one({"files_id": ObjectId(session["storage_id"]), "n": 3})
+        response = await client.post(f"/api/uploads/{upload_id}/complete")
+        return response, await session_doc(upload_id)
+
+    response, session = api(scenario)
+    assert response.status_code == 409
+    assert "Chunk 3 is missing" in response.json()["detail"]
+    assert session["status"] == "open" and not session.get("blob_id")
+
+
+def test_repeated_complete_returns_the_same_file(api):
+    async def scenario(client):
+        upload_id = await upload_parts(client, DATA)
+        first = (await client.post(f"/api/uploads/{upload_id}/complete")).json()
+        second = (await client.post(f"/api/uploads/{upload_id}/complete")).json()
+        late_part = await put_part(client, upload_id, 0, DATA[:PART])
+        blob = await server.db.blobs.find_one({"_id": sha256(DATA)})
+        return first, second, late_part.status_code, blob, await server.db.file_uploads.count_documents({})
+
+    first, second, late_part, blob, uploads = api(scenario)
+    assert first == second
+    assert late_part == 409
+    assert blob["ref_count"] == 1
+    assert uploads == 1
+
+
+def test_complete_attaches_the_creative(api):
+    async def scenario(client):
+        await server.db.advertiser_submissions.insert_one({"id": "sub-1"})
+        upload_id = await upload_parts(client, DATA)
+        missing = await client.post(f"/api/uploads/{upload_id}/complete", json={"submission_id": "nope"})
+        response = await client.post(f"/api/uploads/{upload_id}/complete", json={"submission_id": "sub-1"})
+        return missing.status_code, response.json(), await server.db.advertiser_submissions.find_one({"id": "sub-1"})
+
+    missing, response, submission = api(scenario)
+    assert missing == 404
+    assert submission["creative_id"] == response["file_id"]
+
+
+@pytest.mark.parametrize("lease, status", [(timedelta(minutes=5), 409), (-timedelta(seconds=1), 200)])
+def test_completing_session_is_taken_over_once_its_lease_expires(api, lease, status):
+    async def scenario(client):
+        upload_id = await upload_parts(client, DATA)
+        lease_until = (datetime.now(timezone.utc) + lease).isoformat()
+        await server.db.upload_sessions.update_one(
+            {"id": upload_id}, {"$set": {"status": "completing", "lease_until": lease_until, "file_id": "file-1"}}
+        )
+        response = await client.post(f"/api/uploads/{upload_id}/complete")
+        return response, await session_doc(upload_id)
+
+    response, session = api(scenario)
+    assert response.status_code == status
+    if status == 200:
+        # The file id chosen by the stalled attempt is kept, so its caller's answer stays valid
+        assert response.json()["file_id"] == "file-1"
+        assert session["status"] == "complete"
+    else:
+        assert session["status"] == "completing"
+
+
+def test_failure_after_the_blob_is_referenced_can_be_retried(api, monkeypatch):
+    file_upload = server.FileUpload
+    calls = []
+
+    def flaky_file_upload(**fields):
+        calls.append(fields)
+        if len(calls) == 1:
+            raise RuntimeError("lost the connection")
+        return file_upload(**fields)
+
+    monkeypatch.setattr(server, "FileUpload", flaky_file_upload)
+
+    async def scenario(client):
+        upload_id = await upload_parts(client, DATA)
+        with pytest.raises(RuntimeError):
+            await client.post(f"/api/uploads/{upload_id}/complete")
+        reopened = await session_doc(upload_id)
+        aborted = await client.delete(f"/api/uploads/{upload_id}")
+        response = await client.post(f"/api/uploads/{upload_id}/complete")
+        return reopened, aborted.status_code, response, await server.db.blobs.find_one({"_id": sha256(DATA)})
+
+    reopened, aborted, response, blob = api(scenario)
+    assert reopened["status"] == "open" and reopened["blob_id"]
+    # Its bytes belong to a blob now, so they can no longer be thrown away
+    assert aborted == 404
+    assert response.status_code == 200
+    assert blob["ref_count"] == 1
+
+
+def test_abort_removes_the_session_and_its_chunks(api):
+    async def scenario(client):
+        upload_id = await upload_parts(client, DATA, parts=[0])
+        storage_id = ObjectId((await session_doc(upload_id))["storage_id"])
+        response = await client.delete(f"/api/uploads/{upload_id}")
+        return (response.status_code, await session_doc(upload_id),
+                await server.db["fs.chunks"].count_documents({"files_id": storage_id}))
+
+    assert api(scenario) == (200, None, 0)
+
+
+def gc_pass():
+    async def run():
+        gc = asyncio.create_task(server.collect_upload_sessions())
+        await asyncio.sleep(0.05)
+        gc.cancel()
+    return run()
+
+
+def test_gc_removes_abandoned_sessions(api, monkeypatch):
+    monkeypatch.setattr(server, "RESUMABLE_GC_INTERVAL", 0)
+    expired = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+
+    async def scenario(client):
+        ids = {}
+        for name in ("open", "assembled", "referenced", "complete", "live"):
+            ids[name] = await upload_parts(client, os.urandom(PART + 10))
+        # Assembled into fs.files, then the worker died before referencing a blob
+        await server.assemble_upload(server.UploadSession(**await session_doc(ids["assembled"])))
+        # Referenced a blob, then died before recording the file
+        referenced = server.UploadSession(**await session_doc(ids["referenced"]))
+        referenced.file_id = "never-stored"
+        await server.db.upload_sessions.update_one({"id": referenced.id}, {"$set": {"file_id": "never-stored"}})
+        sha = await server.assemble_upload(referenced)
+        blob_id = await server.register_blob(referenced.storage_id, sha, referenced.size, "video/mp4", True)
+        await server.db.upload_sessions.update_one({"id": referenced.id}, {"$set": {"sha256": sha, "blob_id": blob_id}})
+        assert (await client.post(f"/api/uploads/{ids['complete']}/complete")).status_code == 200
+        storage = {name: ObjectId((await session_doc(upload_id))["storage_id"]) for name, upload_id in ids.items()}
+
+        await server.db.upload_sessions.update_many({"id": {"$ne": ids["live"]}}, {"$set": {"expires_at": expired}})
+        await gc_pass()
+
+        remaining = {name for name, upload_id in ids.items() if await session_doc(upload_id)}
+        chunks = {name: await server.db["fs.chunks"].count_documents({"files_id": files_id})
+                  for name, files_id in storage.items()}
+        files = {name for name, files_id in storage.items() if await server.db["fs.files"].find_one({"_id": files_id})}
+        return remaining, chunks, files, await server.db.blobs.find_one({"_id": sha})
+
+    remaining, chunks, files, released = api(scenario)
+    assert remaining == {"live"}
+    assert chunks["open"] == 0 and chunks["assembled"] == 0
+    assert chunks["referenced"] > 0 and chunks["complete"] > 0 and chunks["live"] > 0
+    assert files == {"referenced", "complete"}
+    # The blob the dead completion referenced is handed back to the blob GC
+    assert released["ref_count"] == 0 and released["released_at"]
@@ -0,0 +1,37 @@
+import gzip
+
+import pytest
+
+import server
+from server import compress_snapshot, negotiate_encoding
+
+BOTH = {"identity": b"", "gzip": b"", "br": b""}
+GZIP_ONLY = {"identity": b"", "gzip": b""}
+
+
+@pytest.mark.parametrize("header, available, expected", [
+    ("gzip, deflate, br", BOTH, "br"),
+    ("gzip, deflate, br", GZIP_ONLY, "gzip"),
+    ("GZIP", BOTH, "gzip"),
+    ("br;q=0, gzip;q=0.5", BOTH, "gzip"),
+    ("br;q=0.0, gzip;q=0", BOTH, "identity"),
+    ("*", BOTH, "br"),
+    ("*;q=0", BOTH, "identity"),
+    ("br;q=oops, gzip", BOTH, "gzip"),
+    ("", BOTH, "identity"),
+    ("identity", BOTH, "identity"),
+])
+def test_negotiate_encoding(header, available, expected):
+    assert negotiate_encoding(header, available) == expected
+
+
+def test_compress_snapshot_round_trips():
+    body = b'{"pages": {"home": []}}' * 100
+    encodings = compress_snapshot(body)
+    assert encodings["identity"] == body
+    assert gzip.decompress(encodings["gzip"]) == body
+    assert len(encodings["gzip"]) < len(body)
+    if server.brotli is None:
+        assert "br" not in encodings
+    else:
+        assert server.brotli.decompress(encodings["br"]) == body
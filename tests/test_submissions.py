@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from pymongo.errors import DuplicateKeyError, WriteError
+
+import server
+
+
+def email_log():
+    return server.new_email_log("driver_application", "ops@example.com", "New application", "Body", {})
+
+
+async def existing_submission(db):
+    await db.driver_applications.create_index("id", unique=True)
+    await db.driver_applications.insert_one({"id": "taken"})
+
+
+@pytest.fixture(params=[False, True], ids=["direct", "batched"])
+def batching(request, monkeypatch):
+    monkeypatch.setattr(server, "SUBMISSION_BATCHING", request.param)
+    monkeypatch.setattr(server, "SUBMISSION_TRANSACTIONS", False)
+    monkeypatch.setattr(server, "insert_batchers", {})
+    return request.param
+
+
+def save(db, batching, doc):
+    async def run():
+        await existing_submission(db)
+        workers = []
+        if batching:
+            for name, write_concern in (("driver_applications", server.SUBMISSION_WRITE_CONCERN),
+                                        ("email_logs", server.EMAIL_LOG_WRITE_CONCERN)):
+                server.insert_batchers[name] = server.make_batcher(name, write_concern)
+                workers.append(asyncio.create_task(server.insert_batchers[name].run()))
+        try:
+            await server.save_submission("driver_applications", doc, email_log())
+        finally:
+            for worker in workers:
+                worker.cancel()
+        return await db.driver_applications.count_documents({}), await db.email_logs.count_documents({})
+
+    return asyncio.run(run())
+
+
+def test_submission_and_log_are_stored(db, batching):
+    assert save(db, batching, {"id": "new", "name": "A"}) == (2, 1)
+
+
+def test_failed_submission_leaves_no_email_log(db, batching):
+    with pytest.raises((DuplicateKeyError, WriteError)):
+        save(db, batching, {"id": "taken", "name": "A"})
+
+    async def counts():
+        return await db.driver_applications.count_documents({}), await db.email_logs.count_documents({})
+    assert asyncio.run(counts()) == (1, 0)
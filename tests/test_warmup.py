@@ -0,0 +1,25 @@
+import asyncio
+
+import server
+
+
+def test_malformed_block_does_not_stop_startup(db, monkeypatch):
+    from mongomock_motor import AsyncMongoMockClient
+
+    monkeypatch.setattr(server, "client", AsyncMongoMockClient())
+    monkeypatch.setattr(server, "WARMUP_ENABLED", True)
+    cache = server.PageCache(ttl=60, max_entries=10)
+    monkeypatch.setattr(server, "cms_page_cache", cache)
+
+    async def run():
+        monkeypatch.setattr(server, "app_ready", asyncio.Event())
+        await db.content_blocks.insert_many([
+            {"id": "a", "page": "home", "section_id": "hero", "content": {}, "order": 0, "is_active": True},
+            {"id": "b", "page": "about", "content": "not a dict", "is_active": True},
+        ])
+        await server.warm_up()
+        return server.app_ready.is_set()
+
+    assert asyncio.run(run())
+    assert cache.get("home") is not None
+    assert cache.get("about") is None